@@ -1,26 +1,54 @@
 from pathlib import Path
+import os
 import shutil
-import pydicom
 from nipype.interfaces.dcm2nii import Dcm2niix
 from utils.rule_checker import RuleChecker
+from utils.dicom_utils import cached_dcm_read
 
-def process_series(series_files, in_folder, temp_folder, series_uid, settings):
-    """Process a single DICOM series through the conversion pipeline"""
+def _stage_file(src_path, dst_path):
+    """Link a source DICOM into the dcm2niix staging directory, copying only if links are unsupported"""
+    if os.path.lexists(dst_path):
+        os.remove(dst_path)
+    try:
+        os.symlink(os.path.abspath(src_path), dst_path)
+    except (OSError, NotImplementedError):
+        shutil.copy2(src_path, dst_path)
 
-    first_dicom = pydicom.dcmread(str(Path(in_folder) / series_files[0]), force=True)
-    series_description = getattr(first_dicom, 'SeriesDescription', '')
+def process_series(series_files, in_folder, temp_folder, series_uid, settings,
+                   rule_checker=None, swi_pattern=None, flair_pattern=None):
+    """
+    Process a single DICOM series through the conversion pipeline
     
+    The rule checker and pattern dicts can be passed in by callers converting
+    several series so they are only built once; otherwise they are derived
+    from settings.
+    """
+
     processing_settings = settings.get("processing", {})
-    swi_pattern = processing_settings.get("swi_pattern", {})
-    flair_pattern = processing_settings.get("flair_pattern", {})
+    if swi_pattern is None:
+        swi_pattern = processing_settings.get("swi_pattern", {})
+    if flair_pattern is None:
+        flair_pattern = processing_settings.get("flair_pattern", {})
     
-    rule_checker = RuleChecker()
+    if rule_checker is None:
+        rule_checker = RuleChecker()
     
-    matches_swi, swi_error = rule_checker.check_pattern_rules(first_dicom, swi_pattern)
-    matches_flair, flair_error = rule_checker.check_pattern_rules(first_dicom, flair_pattern)
+    # Only the description and the tags the rules inspect are needed; series
+    # discovery has usually parsed these already and the header is reused
+    header_tags = ['SeriesDescription', *rule_checker.required_tags(swi_pattern, flair_pattern)]
+    first_path = str(Path(in_folder) / series_files[0])
+    first_dicom = cached_dcm_read(first_path, header_tags)
+    if first_dicom is None:
+        raise ValueError(f"Could not read DICOM header of {first_path}")
+    series_description = getattr(first_dicom, 'SeriesDescription', '')
     
-    if not (matches_swi or matches_flair):
-        return None
+    # Reject non-matching series before any staging or dcm2niix setup. The
+    # FLAIR rules are only evaluated when the SWI rules did not match
+    matches_swi, swi_error = rule_checker.check_pattern_rules(first_dicom, swi_pattern)
+    if not matches_swi:
+        matches_flair, flair_error = rule_checker.check_pattern_rules(first_dicom, flair_pattern)
+        if not matches_flair:
+            return None
     
     safe_description = "".join(c if c.isalnum() else "_" for c in series_description)
     temp_nifti_dir = Path(temp_folder) / "temp_nifti" / safe_description
@@ -29,11 +57,11 @@ def process_series(series_files, in_folder, temp_folder, series_uid, settings):
     temp_input_dir = temp_nifti_dir / "input_structure"
     temp_input_dir.mkdir(exist_ok=True, parents=True)
     
+    # Plain string paths; every file lands directly in temp_input_dir
+    src_prefix = os.path.join(str(in_folder), "")
+    dst_prefix = os.path.join(str(temp_input_dir), "")
     for file in series_files:
-        src_path = Path(in_folder) / file
-        dst_path = temp_input_dir / Path(file).name
-        dst_path.parent.mkdir(exist_ok=True, parents=True)
-        shutil.copy2(src_path, dst_path)
+        _stage_file(f"{src_prefix}{file}", f"{dst_prefix}{os.path.basename(file)}")
     
     converter = Dcm2niix()
     converter.inputs.source_dir = str(temp_input_dir)
@@ -1,14 +1,120 @@
+import io
 import os
+import struct
+import copy
 import logging
+import tempfile
 import numpy as np
 import pydicom
 import nibabel as nib
 from pathlib import Path
+from pydicom.dataset import FileMetaDataset
 from pydicom.uid import generate_uid, ExplicitVRLittleEndian
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# CuPy is optional; without it (or without a CUDA device) scaling stays on the CPU
+try:
+    import cupy as cp
+    GPU_AVAILABLE = cp.cuda.runtime.getDeviceCount() > 0
+except Exception:
+    cp = None
+    GPU_AVAILABLE = False
+
+# Smaller volumes are not worth the host/device transfer
+GPU_MIN_VOLUME_BYTES = 50 * 1024 * 1024
+
+# Numba is optional; without it slabs are scaled with plain NumPy ufuncs
+try:
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _scale_slab_kernel(slab, out, global_min, scale):
+        """Fused subtract, scale, clip and uint16 cast of one slab, parallel over rows"""
+        rows, cols = slab.shape
+        for i in numba.prange(rows):
+            for j in range(cols):
+                value = (slab[i, j] - global_min) * scale
+                if value < 0:
+                    value = 0
+                elif value > 4095:
+                    value = 4095
+                out[i, j] = np.uint16(value)
+
+    @numba.njit(parallel=True, cache=True)
+    def _slab_min_max_kernel(slab):
+        """Single-pass min and max of one slab, from per-row partials"""
+        rows, cols = slab.shape
+        row_min = np.empty(rows, dtype=np.float64)
+        row_max = np.empty(rows, dtype=np.float64)
+        for i in numba.prange(rows):
+            lo = slab[i, 0]
+            hi = slab[i, 0]
+            for j in range(1, cols):
+                value = slab[i, j]
+                if value < lo:
+                    lo = value
+                elif value > hi:
+                    hi = value
+            row_min[i] = lo
+            row_max[i] = hi
+        return row_min.min(), row_max.max()
+
+# Tags that can differ between slices of a traditional series; everything else
+# is shared and comes from the template built once from the reference DICOM
+PER_SLICE_TAGS = (
+    'InstanceNumber',
+    'ImagePositionPatient',
+    'ImageOrientationPatient',
+    'SliceLocation',
+    'SliceThickness',
+    'SpacingBetweenSlices',
+    'PixelSpacing',
+    'AcquisitionDate',
+    'AcquisitionTime',
+)
+
+# (7FE0,0010) Pixel Data. It is appended to each encoded slice as raw bytes,
+# so the template must not hold this or any later element
+PIXEL_DATA_TAG = 0x7FE00010
+
+# Reference attributes that are not carried over into the slice template
+TEMPLATE_EXCLUDED_TAGS = frozenset((
+    'NumberOfFrames',
+    'PerFrameFunctionalGroupsSequence',
+    'SharedFunctionalGroupsSequence',
+    'SOPInstanceUID',
+    'PixelData',
+))
+
+def _read_slice_header(file):
+    """
+    Read the tags of a reference slice needed to order and describe it.
+    Only the UID and the per-slice attributes are parsed.
+    
+    Args:
+        file (str): Path to the DICOM file
+        
+    Returns:
+        pydicom.dataset.FileDataset: DICOM dataset, or None if unreadable
+    """
+    try:
+        ds = pydicom.dcmread(
+            file,
+            stop_before_pixels=True,
+            force=True,
+            specific_tags=['SeriesInstanceUID', *PER_SLICE_TAGS]
+        )
+        return ds
+    except Exception as e:
+        logger.warning(f"Skipping file {file}: {str(e)}")
+        return None
+
 def load_reference_series(reference_dicom):
     """
     Load and sort the entire reference DICOM series.
@@ -31,112 +137,499 @@ def load_reference_series(reference_dicom):
         # For multiframe, we only need the single DICOM file
         return [reference_dicom], reference_dicom.NumberOfFrames, True
     
-    # Traditional multi-slice series - find all DICOMs from the same series
-    series_files = []
-    for file in reference_dir.glob('*.dcm'):
-        try:
-            ds = pydicom.dcmread(str(file), stop_before_pixels=True, force=True)
-            if hasattr(ds, 'SeriesInstanceUID') and ds.SeriesInstanceUID == series_uid:
-                series_files.append((ds, file))
-        except Exception as e:
-            logger.warning(f"Skipping file {file}: {str(e)}")
+    # Traditional multi-slice series - find all DICOMs from the same series.
+    # Header reads are I/O bound, so they are spread over a thread pool
+    with os.scandir(reference_dir) as entries:
+        # Same selection as glob('*.dcm'), using the cached directory entry types.
+        # Empty files (e.g. interrupted transfers) cannot hold a header and are
+        # dropped before they are ever opened
+        files = [
+            entry.path for entry in entries
+            if entry.name.endswith('.dcm') and not entry.name.startswith('.')
+            and entry.is_file() and entry.stat().st_size > 0
+        ]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        datasets = [
+            ds for ds in executor.map(_read_slice_header, files)
+            if ds is not None and getattr(ds, 'SeriesInstanceUID', None) == series_uid
+        ]
     
-    if not series_files:
+    if not datasets:
         raise ValueError(f"No valid DICOM files found in series {series_uid}")
     
-    # Sort by InstanceNumber (for slice order)
-    sorted_files = sorted(series_files, key=lambda x: int(x[0].InstanceNumber))
-    return [dcm for dcm, _ in sorted_files], len(sorted_files), False
+    # Sort by InstanceNumber (for slice order), in place on the datasets
+    datasets.sort(key=lambda ds: int(ds.InstanceNumber))
+    return datasets, len(datasets), False
 
-def reorient_nifti_data(nifti_img):
+def _slice_first_order(nifti_img):
     """
-    Reorient NIFTI data to match DICOM orientation.
+    Axis order that moves the slice axis of a NIFTI image first.
+    
+    Only the header is used, so the layout is known before any voxel data
+    is read.
     
     Args:
         nifti_img (nibabel.Nifti1Image): Input NIFTI image
         
     Returns:
-        tuple: (reoriented data array, number of slices)
+        list: Transpose order from on-disk axes to (slice, in-plane, in-plane)
     """
-    # Get the orientation from the affine
-    affine = nifti_img.affine
-    nifti_data = nifti_img.get_fdata()
-    
-    # Log original shape and affine for debugging
-    logger.info(f"Original NIFTI shape: {nifti_data.shape}")
-    logger.info(f"NIFTI affine:\n{affine}")
-    
     # Determine the slice axis (usually the z-axis)
     # The axis with the largest spacing is typically the slice axis
-    voxel_spacing = np.sqrt(np.sum(affine[:3, :3] ** 2, axis=0))
+    voxel_spacing = np.array(nifti_img.header.get_zooms()[:3])
     slice_axis = np.argmax(voxel_spacing)
     logger.info(f"Detected slice axis: {slice_axis}")
     
-    # Reorder axes if necessary to ensure slice axis is last
-    if slice_axis != 2:
-        # Create the transpose order to move slice_axis to the end
-        transpose_order = list(range(3))
-        transpose_order.pop(slice_axis)
-        transpose_order.append(slice_axis)
-        logger.info(f"Transposing axes with order: {transpose_order}")
-        nifti_data = np.transpose(nifti_data, transpose_order)
+    # Reorder axes so the slice axis is first (outermost), which lets every
+    # slice be read as one contiguous plane once the volume is laid out.
+    # The in-plane axes keep their relative order
+    transpose_order = list(range(3))
+    transpose_order.pop(slice_axis)
+    transpose_order.insert(0, slice_axis)
+    logger.info(f"Transposing axes with order: {transpose_order}")
+    return transpose_order
+
+def _iter_slabs(nifti_img):
+    """
+    Lazily read a NIFTI volume one slab at a time.
+    
+    Slabs are taken along the last axis, which is the slowest varying one on
+    disk, so every read is a contiguous block of the file.
+    
+    Args:
+        nifti_img (nibabel.Nifti1Image): Input NIFTI image
+        
+    Yields:
+        tuple: (slab index, slab data with NIfTI scaling applied)
+    """
+    dataobj = nifti_img.dataobj
+    for k in range(dataobj.shape[-1]):
+        yield k, np.asarray(dataobj[..., k])
+
+def _slab_min_max(slab):
+    """
+    Minimum and maximum of one slab, read in a single pass when Numba is available.
+    
+    Args:
+        slab (numpy.ndarray): Slab data
+        
+    Returns:
+        tuple: (minimum, maximum)
+    """
+    if numba is not None:
+        return _slab_min_max_kernel(slab)
+    return np.min(slab), np.max(slab)
+
+def _scale_slab(slab, out, global_min, scale, scratch=None):
+    """
+    Scale one slab to the 12-bit DICOM range, writing into a uint16 view.
+    
+    Args:
+        slab (numpy.ndarray): Slab data
+        out (numpy.ndarray): uint16 destination of the same shape
+        global_min (float): Minimum of the whole volume
+        scale (numpy.float32): Factor mapping the volume range onto [0, 4095]
+        scratch (numpy.ndarray): Optional float32 buffer of the same shape,
+            reused across slabs by the NumPy path instead of a new temporary
+    """
+    if numba is not None:
+        _scale_slab_kernel(slab, out, np.float32(global_min), np.float32(scale))
+        return
+    slab = np.subtract(slab, global_min, out=scratch, dtype=np.float32, casting='unsafe')
+    np.multiply(slab, scale, out=slab)
+    np.clip(slab, 0, 4095, out=slab)
+    out[...] = slab
+
+def _scale_volume_cpu(nifti_img, out):
+    """
+    Scale a NIFTI volume to the 12-bit DICOM range with NumPy.
+    
+    The volume is streamed slab by slab, once for the global min/max and once
+    to scale each slab into the uint16 destination, so only a single floating
+    point slab is in memory at a time.
+    
+    Args:
+        nifti_img (nibabel.Nifti1Image): Input NIFTI image
+        out (numpy.ndarray): uint16 destination in on-disk axis order, may be
+            a strided view of the final buffer
+    """
+    global_min = np.inf
+    global_max = -np.inf
+    for _, slab in _iter_slabs(nifti_img):
+        slab_min, slab_max = _slab_min_max(slab)
+        global_min = min(global_min, slab_min)
+        global_max = max(global_max, slab_max)
+    logger.info(f"Global min: {global_min}, max: {global_max} for NIfTI volume")
+    
+    # A constant volume has zero range and maps to all zeros
+    value_range = np.float32(global_max - global_min)
+    scale = np.divide(np.float32(4095.0), value_range, out=np.zeros((), dtype=np.float32), where=value_range > 0)
+    scratch = None if numba is not None else np.empty(nifti_img.shape[:-1], dtype=np.float32)
+    for k, slab in _iter_slabs(nifti_img):
+        _scale_slab(slab, out[..., k], global_min, scale, scratch)
+
+def _scale_volume_gpu(nifti_img, out):
+    """
+    Scale a NIFTI volume to the 12-bit DICOM range on the GPU with CuPy.
+    
+    Args:
+        nifti_img (nibabel.Nifti1Image): Input NIFTI image
+        out (numpy.ndarray): uint16 destination in on-disk axis order
+    """
+    # float32 is plenty for a 12-bit result and halves the host to device copy
+    device_volume = cp.asarray(nifti_img.get_fdata(caching="unchanged", dtype=np.float32))
+    global_min = device_volume.min()
+    global_max = device_volume.max()
+    logger.info(f"Global min: {global_min}, max: {global_max} for NIfTI volume (GPU)")
+    
+    value_range = global_max - global_min
+    scale = cp.float32(4095.0) / value_range if value_range > 0 else cp.float32(0)
+    device_volume -= global_min
+    device_volume *= scale
+    np.copyto(out, cp.asnumpy(device_volume.astype(cp.uint16)))
+
+def _scale_volume(nifti_img, out=None):
+    """
+    Scale a NIFTI volume to the 12-bit DICOM range using its global min/max.
+    
+    Large volumes go to the GPU when CuPy and a CUDA device are available;
+    otherwise, or if the GPU path fails, they are streamed through NumPy.
+    
+    Args:
+        nifti_img (nibabel.Nifti1Image): Input NIFTI image
+        out (numpy.ndarray): Optional uint16 destination in on-disk axis order,
+            allocated if not given
+        
+    Returns:
+        numpy.ndarray: uint16 volume in on-disk axis order with values in [0, 4095]
+    """
+    if out is None:
+        out = np.empty(nifti_img.shape, dtype=np.uint16)
+    volume_bytes = np.prod(nifti_img.shape) * np.dtype(np.float32).itemsize
+    if GPU_AVAILABLE and volume_bytes >= GPU_MIN_VOLUME_BYTES:
+        try:
+            _scale_volume_gpu(nifti_img, out)
+            return out
+        except Exception as e:
+            logger.warning(f"GPU scaling failed, falling back to CPU: {str(e)}")
+    _scale_volume_cpu(nifti_img, out)
+    return out
+
+# Template dataset shared by all slices, set once per worker process
+_slice_template = None
+
+# Oriented uint16 volume, mapped once per worker process from its backing file
+_pixel_volume = None
+
+def _apply_overrides(ds, overrides):
+    """
+    Set attributes on a dataset cloned from the template.
+    
+    Cloned datasets share DataElement objects with the template, so existing
+    elements are dropped first and recreated instead of being mutated in place.
+    
+    Args:
+        ds (pydicom.dataset.Dataset): Dataset to update
+        overrides (dict): Keyword to value mapping, None values are skipped
+    """
+    for keyword, value in overrides.items():
+        if value is None:
+            continue
+        if keyword in ds:
+            delattr(ds, keyword)
+        setattr(ds, keyword, value)
+
+def _build_slice_template(ref_dcm, is_multiframe, study_uid, series_uid):
+    """
+    Build the dataset holding every attribute shared by all output slices.
+    
+    Args:
+        ref_dcm (pydicom.dataset.FileDataset): Reference DICOM header
+        is_multiframe (bool): Whether the reference is an enhanced multiframe DICOM
+        study_uid (str): Study Instance UID to keep
+        series_uid (str): Series Instance UID for the new series
+        
+    Returns:
+        pydicom.dataset.Dataset: Template dataset without per-slice attributes
+    """
+    # Copy every element except the multiframe-specific and per-instance ones.
+    # Skipping them up front means the (potentially huge) functional group
+    # sequences are never deep-copied only to be deleted again. Elements
+    # from Pixel Data on (e.g. trailing padding) are dropped so pixel data
+    # can be appended as the last element of every slice
+    template = pydicom.Dataset()
+    for elem in ref_dcm:
+        if elem.keyword not in TEMPLATE_EXCLUDED_TAGS and elem.tag < PIXEL_DATA_TAG:
+            template.add(copy.deepcopy(elem))
+    template.file_meta = copy.deepcopy(ref_dcm.file_meta)
+    
+    # Set transfer syntax: explicit VR, little endian. The source syntax is not
+    # kept since it may be compressed, while the new pixel data is native
+    template.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    template.is_implicit_VR = False
+    template.is_little_endian = True
+    
+    # Update UIDs and metadata
+    mr_image_storage_uid = "1.2.840.10008.5.1.4.1.1.4"  # MR Image Storage
+    template.StudyInstanceUID = study_uid
+    template.SeriesInstanceUID = series_uid
+    template.SOPClassUID = mr_image_storage_uid
+    template.file_meta.MediaStorageSOPClassUID = mr_image_storage_uid
+    
+    # Update series-specific attributes
+    template.SeriesDescription = 'FLAIR Star'
+    template.ProtocolName = 'FLAIR_Star'
+    template.SequenceName = 'flair-star'
+    
+    # Keep original ImageType but mark as derived
+    if hasattr(ref_dcm, 'ImageType'):
+        original_type = list(ref_dcm.ImageType) if isinstance(ref_dcm.ImageType, list) else [str(ref_dcm.ImageType)]
+        template.ImageType = ['DERIVED', 'SECONDARY'] + original_type[2:] if len(original_type) > 2 else ['DERIVED', 'SECONDARY']
+    else:
+        template.ImageType = ['DERIVED', 'SECONDARY']
+    
+    # Set pixel-related attributes
+    template.SamplesPerPixel = 1
+    template.PhotometricInterpretation = "MONOCHROME2"
+    template.BitsAllocated = 16
+    template.BitsStored = 12
+    template.HighBit = 11
+    template.PixelRepresentation = 0
+    template.SeriesNumber = 1000
+    
+    # Set window/level
+    template.WindowCenter = 2047
+    template.WindowWidth = 4095
+    template.RescaleIntercept = 0
+    template.RescaleSlope = 1
+    
+    # Set Instance Creation Date/Time to current date/time, once for the series
+    now = datetime.now()
+    template.InstanceCreationDate = now.strftime("%Y%m%d")
+    template.InstanceCreationTime = now.strftime("%H%M%S")
+    
+    return template
+
+def _write_file(path, *chunks):
+    """
+    Write a complete file from in-memory buffers with raw write calls.
+    
+    Where available the buffers go out in a single vectored os.writev, so
+    they are never concatenated into one bytes object first.
+    
+    Args:
+        path (str): Output file path
+        chunks (bytes-like): File contents, in order
+    """
+    chunks = [memoryview(chunk).cast('B') for chunk in chunks]
+    fd = os.open(path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        # Writes may be partial, so loop until every chunk is done
+        while chunks:
+            if hasattr(os, 'writev'):
+                written = os.writev(fd, chunks)
+            else:
+                written = os.write(fd, chunks[0])
+            while chunks and written >= len(chunks[0]):
+                written -= len(chunks[0])
+                chunks.pop(0)
+            if written:
+                chunks[0] = chunks[0][written:]
+    finally:
+        os.close(fd)
+
+def _create_pixel_file(volume_shape, work_dir=None):
+    """
+    Create the file backing the oriented uint16 output volume.
+    
+    The blocks are allocated up front where the platform supports it, so a
+    full disk fails here with an OSError rather than with a SIGBUS when the
+    memory mapping is written.
+    
+    Args:
+        volume_shape (tuple): (slices, rows, columns) shape of the volume
+        work_dir (str): Directory for the file; the system temp dir if None
+        
+    Returns:
+        str: Path of the created file
+    """
+    size = int(np.prod(volume_shape)) * np.dtype(np.uint16).itemsize
+    fd, path = tempfile.mkstemp(prefix='flair_star_pixels_', suffix='.raw', dir=work_dir)
+    try:
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(fd, 0, size)
+        else:
+            os.ftruncate(fd, size)
+    except BaseException:
+        os.close(fd)
+        os.remove(path)
+        raise
+    os.close(fd)
+    return path
+
+def _init_slice_worker(template, pixel_path, volume_shape):
+    """
+    Store the shared slice template in a worker process and map the
+    oriented pixel volume from its backing file.
+    
+    Args:
+        template (pydicom.dataset.Dataset): Shared slice template
+        pixel_path (str): Path of the file holding the volume
+        volume_shape (tuple): (slices, rows, columns) shape of the volume
+    """
+    global _slice_template, _pixel_volume
+    _slice_template = template
+    _pixel_volume = np.memmap(pixel_path, dtype=np.uint16, mode='r', shape=volume_shape)
+
+def _write_slice(task):
+    """
+    Build and save a single DICOM slice/frame of the output series.
+
+    Runs in a worker process, so the task only carries picklable primitives
+    plus the small set of attributes that differ from the shared template.
+    Pixels are read in place from the shared volume, already scaled and
+    oriented to DICOM rows x columns, and written after the encoded header
+    without going through a pydicom DataElement.
+    
+    Args:
+        task (tuple): Slice index, slice count, per-slice attribute overrides,
+            SOP Instance UID and output file path
+    """
+    z, n_slices, overrides, sop_uid, output_file = task
+    slice_data = _pixel_volume[z]
+    
+    # Shallow-clone the template and apply the per-slice deltas
+    ds = pydicom.Dataset()
+    ds.update(_slice_template)
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.update(_slice_template.file_meta)
+    _apply_overrides(ds.file_meta, {'MediaStorageSOPInstanceUID': sop_uid})
+    ds.preamble = b'\x00' * 128
+    ds.is_implicit_VR = False
+    ds.is_little_endian = True
+    _apply_overrides(ds, overrides)
+    
+    # Slice data is already oriented as rows x columns
+    rows, cols = slice_data.shape
+    _apply_overrides(ds, {
+        'SOPInstanceUID': sop_uid,
+        'Rows': rows,
+        'Columns': cols,
+    })
     
-    # Get the final number of slices
-    n_slices = nifti_data.shape[-1]
-    logger.info(f"Final shape after reorientation: {nifti_data.shape}")
+    # Encode everything but the pixels. The file meta is already complete, so
+    # it is written as is rather than being re-validated for every slice
+    buffer = io.BytesIO()
+    ds.save_as(buffer, write_like_original=True)
     
-    return nifti_data, n_slices
+    # Pixel Data is the last element: an explicit VR little endian OW header
+    # (tag, VR, reserved, 32-bit length) followed by the raw slice bytes,
+    # straight from the shared volume. The whole file goes out in one write
+    pixel_header = struct.pack('<HH2sHI', 0x7FE0, 0x0010, b'OW', 0, slice_data.nbytes)
+    _write_file(output_file, buffer.getbuffer(), pixel_header, slice_data)
+    # Lazy %-formatting: this runs once per slice and debug is usually off
+    logger.debug("Saved slice %d/%d: %s", z + 1, n_slices, output_file)
 
-def nifti_to_dicom(nifti_path, reference_dicom, out_folder, series_uid):
+def nifti_to_dicom(nifti_path, reference_dicom, out_folder, series_uid, work_dir=None):
     """
     Convert NIFTI file to DICOM series using reference DICOM files.
 
     Args:
-        nifti_path (str): Path to input NIFTI file
+        nifti_path (str or nibabel.Nifti1Image): Path to input NIFTI file, or
+            an already loaded image
         reference_dicom (pydicom.dataset.FileDataset): Reference DICOM dataset
         out_folder (str): Output directory for DICOM files
         series_uid (str): Series Instance UID for the new series.
+        work_dir (str): Directory for the temporary pixel volume file; the
+            system temp dir if None
 
     Returns:
         bool: True if successful, False otherwise.
     """
+    pixel_path = None
+    pixel_volume = None
+    disk_view = None
     try:
         # Create output directory if it doesn't exist
-        if not os.path.exists(out_folder):
-            os.makedirs(out_folder)
+        os.makedirs(out_folder, exist_ok=True)
 
         # Load the entire reference series
         logger.info("Loading reference DICOM series...")
         reference_series, n_slices_dicom, is_multiframe = load_reference_series(reference_dicom)
         logger.info(f"Loaded {len(reference_series)} reference DICOM files with {n_slices_dicom} slices/frames")
         
-        # Load the NIfTI file
-        logger.info(f"Reading NIFTI file: {nifti_path}")
-        nifti = nib.load(nifti_path)
-        
-        # Reorient NIFTI data to match DICOM orientation
-        nifti_data, n_slices_nifti = reorient_nifti_data(nifti)
+        # Load the NIfTI file unless an in-memory image was handed over. Keep it
+        # open so the volume can be streamed in consecutive slabs without
+        # reopening (and re-inflating) it per read
+        if isinstance(nifti_path, (str, os.PathLike)):
+            logger.info(f"Reading NIFTI file: {nifti_path}")
+            nifti = nib.load(nifti_path, keep_file_open=True)
+        else:
+            logger.info("Using in-memory NIFTI image")
+            nifti = nifti_path
         
-        # Compute global min/max for the whole volume
-        global_min = np.min(nifti_data)
-        global_max = np.max(nifti_data)
-        logger.info(f"Global min: {global_min}, max: {global_max} for NIfTI volume")
+        # Work out the DICOM orientation from the header alone: slice axis
+        # first, then the in-plane axes matched to DICOM Rows/Columns
+        logger.info(f"Original NIFTI shape: {nifti.shape}")
+        slice_order = _slice_first_order(nifti)
+        reoriented_shape = tuple(nifti.shape[axis] for axis in slice_order)
+        n_slices_nifti = reoriented_shape[0]
+        logger.info(f"Final shape after reorientation: {reoriented_shape}")
         
-        # Verify slice count compatibility
+        # Verify slice count compatibility before reading any voxel data
         if n_slices_nifti != n_slices_dicom:
             raise ValueError(
                 f"Number of NIFTI slices ({n_slices_nifti}) "
                 f"doesn't match reference series ({n_slices_dicom})"
             )
         
+        orig_rows = reference_dicom.Rows
+        orig_cols = reference_dicom.Columns
+        plane_shape = reoriented_shape[1:]
+        # Match dimensions: check if a transpose is needed. The transposed
+        # match is tested first, so square slices are transposed as well
+        if plane_shape == (orig_cols, orig_rows):
+            plane_order = (0, 2, 1)
+        elif plane_shape != (orig_rows, orig_cols):
+            logger.warning(f"Slice shape {plane_shape} vs DICOM {orig_rows}x{orig_cols}. Applying transpose.")
+            plane_order = (0, 2, 1)
+        else:
+            plane_order = (0, 1, 2)
+        volume_shape = tuple(reoriented_shape[axis] for axis in plane_order)
+        
+        # The output volume is C-contiguous (slice, row, column) with both
+        # in-plane axes flipped, so every slice is a single linear block of
+        # memory. It is a memory-mapped file in the work directory, which the
+        # slice writer processes map by path, so slices are never pickled.
+        # A file rather than POSIX shared memory keeps the volume out of
+        # /dev/shm, which containers cap at 64 MB by default. Scaling writes
+        # straight into it through a view in on-disk axis order, so the
+        # reorientation and flips cost no extra pass over the volume
+        pixel_path = _create_pixel_file(volume_shape, work_dir)
+        pixel_volume = np.memmap(pixel_path, dtype=np.uint16, mode='r+', shape=volume_shape)
+        disk_view = pixel_volume[:, ::-1, ::-1].transpose(plane_order).transpose(np.argsort(slice_order))
+        _scale_volume(nifti, disk_view)
+        disk_view = None
+        
         # Get study UID from reference series (keep the same study)
-        study_uid = reference_series[0].StudyInstanceUID
-        mr_image_storage_uid = "1.2.840.10008.5.1.4.1.1.4"  # MR Image Storage
+        study_uid = reference_dicom.StudyInstanceUID
         
         # For multiframe DICOM, extract ALL frame data BEFORE any copying
         if is_multiframe:
             ref_dcm = reference_series[0]
             
+            # The shared functional group is the same for every frame, so its
+            # fallback values are looked up once rather than per frame
+            shared_thickness = None
+            shared_spacing = None
+            if hasattr(ref_dcm, 'SharedFunctionalGroupsSequence'):
+                shared_group = ref_dcm.SharedFunctionalGroupsSequence[0]
+                if hasattr(shared_group, 'PixelMeasuresSequence'):
+                    pixel_measures = shared_group.PixelMeasuresSequence[0]
+                    shared_thickness = getattr(pixel_measures, 'SliceThickness', None)
+                    shared_spacing = getattr(pixel_measures, 'PixelSpacing', None)
+            per_frame_groups = getattr(ref_dcm, 'PerFrameFunctionalGroupsSequence', None)
+            
             # Pre-extract all frame data to avoid shallow copy issues
             frame_data = []
             for z in range(n_slices_dicom):
@@ -148,9 +641,9 @@ def nifti_to_dicom(nifti_path, reference_dicom, out_folder, series_uid):
                     'slice_location': None
                 }
                 
-                if hasattr(ref_dcm, 'PerFrameFunctionalGroupsSequence') and len(ref_dcm.PerFrameFunctionalGroupsSequence) > z:
-                    frame_group = ref_dcm.PerFrameFunctionalGroupsSequence[z]
-                    logger.debug(f"Pre-extracting frame {z} from PerFrameFunctionalGroupsSequence")
+                if per_frame_groups is not None and len(per_frame_groups) > z:
+                    frame_group = per_frame_groups[z]
+                    logger.debug("Pre-extracting frame %d from PerFrameFunctionalGroupsSequence", z)
                     
                     # Extract PixelMeasuresSequence (contains SliceThickness and PixelSpacing)
                     if hasattr(frame_group, 'PixelMeasuresSequence'):
@@ -173,193 +666,61 @@ def nifti_to_dicom(nifti_path, reference_dicom, out_folder, series_uid):
                             frame_info['image_position'] = plane_position.ImagePositionPatient
                             frame_info['slice_location'] = plane_position.ImagePositionPatient[2]
                             
-                            logger.debug(f"Pre-extracted ImagePositionPatient for frame {z}: {frame_info['image_position']}")
+                            logger.debug("Pre-extracted ImagePositionPatient for frame %d: %s", z, frame_info['image_position'])
                 
-                # Fallback: try to get attributes from SharedFunctionalGroupsSequence
-                if hasattr(ref_dcm, 'SharedFunctionalGroupsSequence'):
-                    shared_group = ref_dcm.SharedFunctionalGroupsSequence[0]
-                    if hasattr(shared_group, 'PixelMeasuresSequence'):
-                        pixel_measures = shared_group.PixelMeasuresSequence[0]
-                        if hasattr(pixel_measures, 'SliceThickness') and frame_info['slice_thickness'] is None:
-                            frame_info['slice_thickness'] = pixel_measures.SliceThickness
-                        if hasattr(pixel_measures, 'PixelSpacing') and frame_info['pixel_spacing'] is None:
-                            frame_info['pixel_spacing'] = pixel_measures.PixelSpacing
+                # Fallback: use the attributes from SharedFunctionalGroupsSequence
+                if frame_info['slice_thickness'] is None:
+                    frame_info['slice_thickness'] = shared_thickness
+                if frame_info['pixel_spacing'] is None:
+                    frame_info['pixel_spacing'] = shared_spacing
                 
                 frame_data.append(frame_info)
         
-        # Process each slice/frame
+        # Attributes shared by every slice go into one template; each task only
+        # carries what differs per slice, so no datasets are re-read or copied
+        template = _build_slice_template(reference_dicom, is_multiframe, study_uid, series_uid)
+        # Derive the SOP Instance UIDs from one random root instead of hashing a
+        # new UID per slice. The 2.25 form (prefix=None) is at most 44
+        # characters, leaving room for the slice suffix within the 64 limit
+        instance_root = generate_uid(prefix=None)
+        sop_uids = [f"{instance_root}.{z + 1}" for z in range(n_slices_dicom)]
+        name_fmt = os.path.join(out_folder, f'{series_uid}_{{:04d}}.dcm')
+        tasks = []
         for z in range(n_slices_dicom):
             if is_multiframe:
-                # Use pre-extracted frame data
                 frame_info = frame_data[z]
-                slice_thickness = frame_info['slice_thickness']
-                pixel_spacing = frame_info['pixel_spacing']
-                image_orientation = frame_info['image_orientation']
-                image_position = frame_info['image_position']
-                slice_location = frame_info['slice_location']
-                
-                # Create new DICOM dataset by copying the reference
-                ds = ref_dcm.copy()
-                # Remove multiframe-specific attributes
-                if hasattr(ds, 'NumberOfFrames'):
-                    del ds.NumberOfFrames
-                if hasattr(ds, 'PerFrameFunctionalGroupsSequence'):
-                    del ds.PerFrameFunctionalGroupsSequence
-                if hasattr(ds, 'SharedFunctionalGroupsSequence'):
-                    del ds.SharedFunctionalGroupsSequence
+                overrides = {
+                    'InstanceNumber': z + 1,
+                    'SliceThickness': frame_info['slice_thickness'],
+                    'PixelSpacing': frame_info['pixel_spacing'],
+                    'ImageOrientationPatient': frame_info['image_orientation'],
+                    'ImagePositionPatient': frame_info['image_position'],
+                    'SliceLocation': frame_info['slice_location'],
+                }
             else:
-                # For traditional series, use the corresponding reference file
                 ref_dcm = reference_series[z]
-                # Create new DICOM dataset by copying the reference
-                ds = ref_dcm.copy()
-            
-            # Set transfer syntax: explicit VR, little endian
-            ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
-            ds.is_implicit_VR = False
-            ds.is_little_endian = True
-            
-            # Update UIDs and metadata
-            ds.StudyInstanceUID = study_uid
-            ds.SeriesInstanceUID = series_uid
-            ds.SOPInstanceUID = generate_uid()
-            ds.SOPClassUID = mr_image_storage_uid
-            
-            # Update series-specific attributes
-            ds.SeriesDescription = 'FLAIR Star'
-            ds.ProtocolName = 'FLAIR_Star'
-            ds.SequenceName = 'flair-star'
-            ds.ImageType = ['DERIVED', 'SECONDARY']
-            
-            # Set instance number for slice ordering
-            if is_multiframe:
-                ds.InstanceNumber = z + 1
-            else:
-                ds.InstanceNumber = ref_dcm.InstanceNumber
-            
-            # Set essential spacing and positioning attributes
-            if is_multiframe:
-                # For multiframe DICOMs, use the extracted values
-                if slice_thickness is not None:
-                    ds.SliceThickness = slice_thickness
-                if pixel_spacing is not None:
-                    ds.PixelSpacing = pixel_spacing
-                if image_orientation is not None:
-                    ds.ImageOrientationPatient = image_orientation
-                if image_position is not None:
-                    ds.ImagePositionPatient = image_position
-                if slice_location is not None:
-                    ds.SliceLocation = slice_location
-            else:
-                # For traditional DICOMs, copy attributes directly
-                if hasattr(ref_dcm, 'SliceThickness'):
-                    ds.SliceThickness = ref_dcm.SliceThickness
-                if hasattr(ref_dcm, 'SpacingBetweenSlices'):
-                    ds.SpacingBetweenSlices = ref_dcm.SpacingBetweenSlices
-                if hasattr(ref_dcm, 'PixelSpacing'):
-                    ds.PixelSpacing = ref_dcm.PixelSpacing
-                if hasattr(ref_dcm, 'ImageOrientationPatient'):
-                    ds.ImageOrientationPatient = ref_dcm.ImageOrientationPatient
-            
-            # Handle slice positioning for traditional series (multiframe positioning is handled above)
-            if not is_multiframe:
-                # For traditional series, copy the original positioning
-                if hasattr(ref_dcm, 'ImagePositionPatient'):
-                    ds.ImagePositionPatient = ref_dcm.ImagePositionPatient
-                if hasattr(ref_dcm, 'SliceLocation'):
-                    ds.SliceLocation = ref_dcm.SliceLocation
-            
-            # Set Instance Creation Date/Time to current date/time
-            now = datetime.now()
-            ds.InstanceCreationDate = now.strftime("%Y%m%d")
-            ds.InstanceCreationTime = now.strftime("%H%M%S")
-            
-            # Get the corresponding slice data
-            slice_data = nifti_data[:, :, z]
-            
-            # Match dimensions: check if a transpose is needed
-            orig_rows = ds.Rows
-            orig_cols = ds.Columns
-            if (slice_data.shape[0] == orig_cols) and (slice_data.shape[1] == orig_rows):
-                slice_data = slice_data.T
-            elif (slice_data.shape[0] != orig_rows) or (slice_data.shape[1] != orig_cols):
-                logger.warning(f"Slice {z} shape {slice_data.shape} vs DICOM {orig_rows}x{orig_cols}. Applying transpose.")
-                slice_data = slice_data.T
-            
-            # Apply orientation fixes if needed
-            slice_data = np.flip(slice_data, (0, 1))
-            
-            # Scale to DICOM range using global min/max
-            if global_max > global_min:
-                scaled_data = ((slice_data - global_min) / (global_max - global_min) * 4095)
-            else:
-                scaled_data = slice_data
-            scaled_data = scaled_data.astype(np.uint16)
-            
-            # Set pixel-related attributes
-            ds.Rows = scaled_data.shape[0]
-            ds.Columns = scaled_data.shape[1]
-            ds.PixelData = scaled_data.tobytes()
-            ds.SamplesPerPixel = 1
-            ds.PhotometricInterpretation = "MONOCHROME2"
-            ds.BitsAllocated = 16
-            ds.BitsStored = 12
-            ds.HighBit = 11
-            ds.PixelRepresentation = 0
-            ds["PixelData"].VR = "OW"
-            ds.SeriesNumber = 1000
-            
-            # Set window/level
-            ds.WindowCenter = 2047
-            ds.WindowWidth = 4095
-            ds.RescaleIntercept = 0
-            ds.RescaleSlope = 1
-            
-            # Copy additional important attributes for proper 3D reconstruction
-            if hasattr(ref_dcm, 'ImageType'):
-                # Keep original ImageType but mark as derived
-                original_type = list(ref_dcm.ImageType) if isinstance(ref_dcm.ImageType, list) else [str(ref_dcm.ImageType)]
-                ds.ImageType = ['DERIVED', 'SECONDARY'] + original_type[2:] if len(original_type) > 2 else ['DERIVED', 'SECONDARY']
-            
-            # Copy study and patient information
-            if hasattr(ref_dcm, 'StudyDate'):
-                ds.StudyDate = ref_dcm.StudyDate
-            if hasattr(ref_dcm, 'StudyTime'):
-                ds.StudyTime = ref_dcm.StudyTime
-            if hasattr(ref_dcm, 'PatientName'):
-                ds.PatientName = ref_dcm.PatientName
-            if hasattr(ref_dcm, 'PatientID'):
-                ds.PatientID = ref_dcm.PatientID
-            if hasattr(ref_dcm, 'PatientBirthDate'):
-                ds.PatientBirthDate = ref_dcm.PatientBirthDate
-            if hasattr(ref_dcm, 'PatientSex'):
-                ds.PatientSex = ref_dcm.PatientSex
-            if hasattr(ref_dcm, 'PatientAge'):
-                ds.PatientAge = ref_dcm.PatientAge
-            
-            # Copy acquisition parameters
-            if hasattr(ref_dcm, 'AcquisitionDate'):
-                ds.AcquisitionDate = ref_dcm.AcquisitionDate
-            if hasattr(ref_dcm, 'AcquisitionTime'):
-                ds.AcquisitionTime = ref_dcm.AcquisitionTime
-            if hasattr(ref_dcm, 'RepetitionTime'):
-                ds.RepetitionTime = ref_dcm.RepetitionTime
-            if hasattr(ref_dcm, 'EchoTime'):
-                ds.EchoTime = ref_dcm.EchoTime
-            if hasattr(ref_dcm, 'MagneticFieldStrength'):
-                ds.MagneticFieldStrength = ref_dcm.MagneticFieldStrength
-            if hasattr(ref_dcm, 'ScanningSequence'):
-                ds.ScanningSequence = ref_dcm.ScanningSequence
-            if hasattr(ref_dcm, 'SequenceVariant'):
-                ds.SequenceVariant = ref_dcm.SequenceVariant
-            if hasattr(ref_dcm, 'ScanOptions'):
-                ds.ScanOptions = ref_dcm.ScanOptions
-            if hasattr(ref_dcm, 'MRAcquisitionType'):
-                ds.MRAcquisitionType = ref_dcm.MRAcquisitionType
-            
-            # Save the DICOM file
-            output_file = os.path.join(out_folder, f'{series_uid}_{z+1:04d}.dcm')
-            ds.save_as(output_file, write_like_original=False)
-            logger.debug(f"Saved slice {z + 1}/{n_slices_dicom}: {output_file}")
+                overrides = {keyword: getattr(ref_dcm, keyword, None) for keyword in PER_SLICE_TAGS}
+            tasks.append((
+                z,
+                n_slices_dicom,
+                overrides,
+                sop_uids[z],
+                name_fmt.format(z + 1)
+            ))
+        
+        # Write slices in parallel - per-slice work is independent and CPU bound.
+        # The template is pickled once per worker rather than once per slice,
+        # and the pixel volume is only mapped by path.
+        # Never start more workers than there are slices, and hand each worker
+        # a few batches so small series still spread over every worker
+        n_workers = min(os.cpu_count() or 1, n_slices_dicom)
+        chunksize = max(1, n_slices_dicom // (n_workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_init_slice_worker,
+            initargs=(template, pixel_path, volume_shape)
+        ) as executor:
+            list(executor.map(_write_slice, tasks, chunksize=chunksize))
         
         logger.info(f"Successfully converted NIFTI to {n_slices_dicom} DICOM files")
         return True
@@ -368,4 +729,12 @@ def nifti_to_dicom(nifti_path, reference_dicom, out_folder, series_uid):
         logger.error(f"Error converting NIFTI to DICOM: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
-        return False
\ No newline at end of file
+        return False
+    finally:
+        # Drop the array views (closing the mapping) before removing the file
+        pixel_volume = disk_view = None
+        if pixel_path is not None:
+            try:
+                os.remove(pixel_path)
+            except OSError as e:
+                logger.warning(f"Could not remove temporary pixel file {pixel_path}: {str(e)}")
\ No newline at end of file
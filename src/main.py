@@ -14,6 +14,7 @@ Options:
     --temp-dir DIR       Temporary directory for intermediate files
     --swi-pattern STR    Pattern to match SWI series in SeriesDescription
     --flair-pattern STR  Pattern to match FLAIR series in SeriesDescription
+                         (comma-separated alternatives, e.g. "SWI,SWAN")
 
 You have two options for specifying the series to process:
 1. Use a task.json file in the input directory with detailed pattern rules
@@ -27,7 +28,9 @@ import logging
 import json
 import shutil
 import os
+import tempfile
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from processors.series_processor import SeriesProcessor
 from utils.dicom_utils import find_dicom_series
 from utils.dicom_sender import DICOMSender
@@ -41,8 +44,10 @@ def setup_logging():
         'Location: %(pathname)s:%(lineno)d\n'
     )
     
+    # LOG_LEVEL (e.g. WARNING) lets batch runs skip the per-step progress output
+    log_level = getattr(logging, os.environ.get('LOG_LEVEL', 'INFO').upper(), logging.INFO)
     logging.basicConfig(
-        level=logging.INFO,
+        level=log_level,
         format=log_format,
         datefmt='%Y-%m-%d %H:%M:%S'
     )
@@ -56,8 +61,8 @@ def setup_argparse():
     parser.add_argument('--input-dir', required=False, help='Input directory containing DICOM files')
     parser.add_argument('--output-dir', required=False, help='Output directory for processed files')
     parser.add_argument('--temp-dir', required=False, help='Temporary directory for intermediate files')
-    parser.add_argument('--swi-pattern', required=False, help='Pattern to match SWI series in SeriesDescription (e.g., "SWI")')
-    parser.add_argument('--flair-pattern', required=False, help='Pattern to match FLAIR series in SeriesDescription (e.g., "FLAIR")')
+    parser.add_argument('--swi-pattern', required=False, help='Pattern to match SWI series in SeriesDescription (e.g., "SWI" or "SWI,SWAN")')
+    parser.add_argument('--flair-pattern', required=False, help='Pattern to match FLAIR series in SeriesDescription (e.g., "FLAIR" or "FLAIR,DARKFLUID")')
     parser.add_argument('--swi-uid', required=False, help='SeriesInstanceUID for SWI series')
     parser.add_argument('--flair-uid', required=False, help='SeriesInstanceUID for FLAIR series')
     args = parser.parse_args()
@@ -73,13 +78,35 @@ def setup_argparse():
     
     return args
 
-def load_task_json(input_dir):
+def _env_flag(env, name):
+    """
+    Parse a boolean flag from environment variables
+    
+    Args:
+        env (Mapping): Environment variables
+        name (str): Variable name
+        
+    Returns:
+        bool: True or False for recognised values, None if unset or unrecognised
+    """
+    value = env.get(name, '').lower()
+    if value in ('true', 'yes', '1'):
+        return True
+    if value in ('false', 'no', '0'):
+        return False
+    return None
+
+def load_task_json(input_dir, env=None):
     """Load and validate task.json from file or environment variable"""
     logger = logging.getLogger(__name__)
     task_data = None
     
+    if env is None:
+        env = os.environ
+    copy_all_env = _env_flag(env, 'COPY_ALL')
+    
     # First, try to load from TASK_JSON environment variable
-    env_task_json = os.environ.get('TASK_JSON')
+    env_task_json = env.get('TASK_JSON')
     if env_task_json:
         logger.info("Loading task configuration from TASK_JSON environment variable")
         try:
@@ -96,12 +123,12 @@ def load_task_json(input_dir):
             logger.warning("task.json not found in input directory and TASK_JSON env var not set")
             
             # Check environment variables for patterns
-            swi_pattern = os.environ.get('SWI_PATTERN')
-            flair_pattern = os.environ.get('FLAIR_PATTERN')
+            swi_pattern = env.get('SWI_PATTERN')
+            flair_pattern = env.get('FLAIR_PATTERN')
             
             if swi_pattern and flair_pattern:
                 logger.info(f"Using patterns from environment variables: SWI='{swi_pattern}', FLAIR='{flair_pattern}'")
-                return create_settings_from_patterns(swi_pattern, flair_pattern)
+                return create_settings_from_patterns(swi_pattern, flair_pattern, copy_all_env is True)
             else:
                 raise ValueError("task.json not found, TASK_JSON env var not set, and environment variables SWI_PATTERN and/or FLAIR_PATTERN are not set")
             
@@ -150,11 +177,10 @@ def load_task_json(input_dir):
                     )
         
         # Add COPY_ALL flag to settings - this can override the JSON setting
-        copy_all_env = os.environ.get('COPY_ALL', '').lower()
-        if copy_all_env in ('true', 'yes', '1'):
+        if copy_all_env is True:
             settings['copy_all'] = True
             logger.info("COPY_ALL flag set to True from environment variable")
-        elif copy_all_env in ('false', 'no', '0'):
+        elif copy_all_env is False:
             settings['copy_all'] = False
             logger.info("COPY_ALL flag set to False from environment variable")
         else:
@@ -168,34 +194,43 @@ def load_task_json(input_dir):
     except Exception as e:
         raise ValueError(f"Error processing task configuration: {str(e)}")
 
-def create_settings_from_patterns(swi_pattern, flair_pattern):
+def _description_rule(pattern):
+    """
+    Build a SeriesDescription rule from a pattern string
+    
+    Comma-separated alternatives become a single contains_any rule, which the
+    rule checker matches in one pass over the description.
+    """
+    alternatives = [p.strip() for p in pattern.split(',') if p.strip()]
+    if len(alternatives) > 1:
+        return {
+            "tag": "SeriesDescription",
+            "operation": "contains_any",
+            "value": alternatives
+        }
+    return {
+        "tag": "SeriesDescription",
+        "operation": "contains",
+        "value": pattern
+    }
+
+def create_settings_from_patterns(swi_pattern, flair_pattern, copy_all=None):
     """Create a settings dictionary from pattern strings provided in command line"""
     logger = logging.getLogger(__name__)
     logger.info(f"Creating settings from patterns: SWI='{swi_pattern}', FLAIR='{flair_pattern}'")
     
-    # Check for COPY_ALL environment variable
-    copy_all = os.environ.get('COPY_ALL', '').lower() in ('true', 'yes', '1')
+    # Fall back to the COPY_ALL environment variable if not resolved by the caller
+    if copy_all is None:
+        copy_all = _env_flag(os.environ, 'COPY_ALL') is True
     
     # Create minimal settings structure with pattern rules
     settings = {
         "processing": {
             "swi_pattern": {
-                "rules": [
-                    {
-                        "tag": "SeriesDescription",
-                        "operation": "contains",
-                        "value": swi_pattern
-                    }
-                ]
+                "rules": [_description_rule(swi_pattern)]
             },
             "flair_pattern": {
-                "rules": [
-                    {
-                        "tag": "SeriesDescription",
-                        "operation": "contains",
-                        "value": flair_pattern
-                    }
-                ]
+                "rules": [_description_rule(flair_pattern)]
             }
         },
         "copy_all": copy_all
@@ -203,13 +238,14 @@ def create_settings_from_patterns(swi_pattern, flair_pattern):
     
     return settings
 
-def create_settings_from_uids(swi_uid, flair_uid):
+def create_settings_from_uids(swi_uid, flair_uid, copy_all=None):
     """Create a settings dictionary from SeriesInstanceUIDs provided in command line"""
     logger = logging.getLogger(__name__)
     logger.info(f"Creating settings from UIDs: SWI='{swi_uid}', FLAIR='{flair_uid}'")
     
-    # Check for COPY_ALL environment variable
-    copy_all = os.environ.get('COPY_ALL', '').lower() in ('true', 'yes', '1')
+    # Fall back to the COPY_ALL environment variable if not resolved by the caller
+    if copy_all is None:
+        copy_all = _env_flag(os.environ, 'COPY_ALL') is True
     
     # Create minimal settings structure with UIDs
     settings = {
@@ -238,6 +274,94 @@ def create_settings_from_uids(swi_uid, flair_uid):
     
     return settings
 
+def resolve_settings(args):
+    """
+    Build the series selection settings from CLI arguments, environment
+    variables or task.json, in that order of precedence
+    
+    A complete UID or pattern pair on the command line wins. Otherwise CLI
+    values are completed from the environment, and task.json is only read
+    when neither a UID pair nor a pattern pair can be formed.
+    
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments
+        
+    Returns:
+        dict: Settings with processing pattern rules
+    """
+    logger = logging.getLogger(__name__)
+    
+    # Snapshot the environment once for everything resolved below
+    env = dict(os.environ)
+    copy_all = _env_flag(env, 'COPY_ALL') is True
+    
+    # Check if SeriesInstanceUIDs are provided
+    if args.swi_uid and args.flair_uid:
+        logger.info("Using SeriesInstanceUIDs for series matching...")
+        settings = create_settings_from_uids(args.swi_uid, args.flair_uid, copy_all)
+        logger.info("UID settings created successfully")
+        return settings
+    
+    # Check if pattern matching is provided
+    if args.swi_pattern and args.flair_pattern:
+        logger.info("Using command-line patterns for series matching...")
+        settings = create_settings_from_patterns(args.swi_pattern, args.flair_pattern, copy_all)
+        logger.info("Pattern settings created successfully")
+        return settings
+    
+    env_swi_uid = env.get('SWI_UID')
+    env_flair_uid = env.get('FLAIR_UID')
+    env_swi_pattern = env.get('SWI_PATTERN')
+    env_flair_pattern = env.get('FLAIR_PATTERN')
+    
+    if args.swi_pattern or args.flair_pattern or args.swi_uid or args.flair_uid:
+        source = "combined sources"
+        if (args.swi_pattern and args.flair_uid) or (args.swi_uid and args.flair_pattern):
+            logger.warning("Mixed pattern and UID specification is not supported.")
+            logger.warning("Please use either patterns or UIDs for both series.")
+        else:
+            # Determine what's provided
+            if args.swi_pattern:
+                provided_type = "SWI pattern"
+            elif args.flair_pattern:
+                provided_type = "FLAIR pattern"
+            elif args.swi_uid:
+                provided_type = "SWI UID"
+            else:  # args.flair_uid
+                provided_type = "FLAIR UID"
+            logger.warning(f"Only {provided_type} was provided. Both are required.")
+    else:
+        source = "environment variables"
+        # FLAIRSTAR environment variables are the primary interface, the
+        # legacy ones are kept for backward compatibility
+        flairstar_swi_uid = env.get('FLAIRSTAR_SWI_SCAN_ID')
+        flairstar_flair_uid = env.get('FLAIRSTAR_FLAIR_SCAN_ID')
+        if flairstar_swi_uid:
+            env_swi_uid = flairstar_swi_uid
+            logger.info("Using FLAIRSTAR_SWI_SCAN_ID environment variable")
+        if flairstar_flair_uid:
+            env_flair_uid = flairstar_flair_uid
+            logger.info("Using FLAIRSTAR_FLAIR_SCAN_ID environment variable")
+    
+    swi_uid = args.swi_uid or env_swi_uid
+    flair_uid = args.flair_uid or env_flair_uid
+    swi_pattern = args.swi_pattern or env_swi_pattern
+    flair_pattern = args.flair_pattern or env_flair_pattern
+    
+    if swi_uid and flair_uid:
+        logger.info(f"Using UIDs from {source}: SWI='{swi_uid}', FLAIR='{flair_uid}'")
+        settings = create_settings_from_uids(swi_uid, flair_uid, copy_all)
+        logger.info("UID settings created successfully")
+    elif swi_pattern and flair_pattern:
+        logger.info(f"Using patterns from {source}: SWI='{swi_pattern}', FLAIR='{flair_pattern}'")
+        settings = create_settings_from_patterns(swi_pattern, flair_pattern, copy_all)
+        logger.info("Pattern settings created successfully")
+    else:
+        logger.info("Loading task.json configuration...")
+        settings = load_task_json(args.input_dir, env)
+        logger.info("Configuration loaded and validated successfully")
+    return settings
+
 def main():
     setup_logging()
     logger = logging.getLogger(__name__)
@@ -264,135 +388,55 @@ def main():
         except Exception as e:
             raise ValueError(f"Cannot create output directory: {str(e)}")
             
-        # Set up temp directory
-        if args.temp_dir:
-            temp_dir = Path(args.temp_dir)
-            logger.info(f"Using specified temporary directory: {temp_dir}")
-        else:
-            temp_dir = Path("/data/temp")
-            logger.info(f"Using default temporary directory: {temp_dir}")
-            
+        # Set up temp directory. Without --temp-dir every run gets its own
+        # directory under TEMP_PATH (e.g. a tmpfs mount), removed on exit
+        temp_context = None
         try:
-            temp_dir.mkdir(parents=True, exist_ok=True)
+            if args.temp_dir:
+                temp_dir = Path(args.temp_dir)
+                logger.info(f"Using specified temporary directory: {temp_dir}")
+                temp_dir.mkdir(parents=True, exist_ok=True)
+            else:
+                temp_base = Path(os.environ.get('TEMP_PATH', '/data/temp'))
+                temp_base.mkdir(parents=True, exist_ok=True)
+                temp_context = tempfile.TemporaryDirectory(prefix='flair_star_', dir=str(temp_base))
+                temp_dir = Path(temp_context.name)
+                logger.info(f"Using default temporary directory: {temp_dir}")
             logger.info("Temporary directory created successfully")
         except Exception as e:
             raise ValueError(f"Cannot create temporary directory: {str(e)}")
         
+        # Directory the series are scanned and read from; replaced by a local
+        # copy when input staging is enabled
+        scan_dir = args.input_dir
+        stage_executor = None
+        staging = None
+        cleanup_executor = None
+        
         try:
+            # Optionally stage the input tree onto the temporary directory, e.g.
+            # when the input is a slow network share. The copy runs in the
+            # background while the configuration is resolved
+            if _env_flag(os.environ, 'STAGE_INPUT'):
+                staged_input_dir = temp_dir / 'input'
+                logger.info(f"STAGE_INPUT flag is set, staging input directory to {staged_input_dir}")
+                stage_executor = ThreadPoolExecutor(max_workers=1)
+                staging = stage_executor.submit(
+                    shutil.copytree, input_dir, staged_input_dir, dirs_exist_ok=True
+                )
+            
             # Step 1: Load or create configuration
+            settings = resolve_settings(args)
             
-            # Check if SeriesInstanceUIDs are provided
-            if args.swi_uid and args.flair_uid:
-                logger.info("Using SeriesInstanceUIDs for series matching...")
-                settings = create_settings_from_uids(args.swi_uid, args.flair_uid)
-                logger.info("UID settings created successfully")
-            # Check if pattern matching is provided
-            elif args.swi_pattern and args.flair_pattern:
-                logger.info("Using command-line patterns for series matching...")
-                settings = create_settings_from_patterns(args.swi_pattern, args.flair_pattern)
-                logger.info("Pattern settings created successfully")
-            # Check if one of each is provided (pattern and UID)
-            elif (args.swi_pattern and args.flair_uid) or (args.swi_uid and args.flair_pattern):
-                logger.warning("Mixed pattern and UID specification is not supported.")
-                logger.warning("Please use either patterns or UIDs for both series.")
-                
-                # Check if env vars can complete the specification
-                env_swi_uid = os.environ.get('SWI_UID')
-                env_flair_uid = os.environ.get('FLAIR_UID')
-                env_swi_pattern = os.environ.get('SWI_PATTERN')
-                env_flair_pattern = os.environ.get('FLAIR_PATTERN')
-                
-                # Try to complete UIDs
-                if (args.swi_uid or env_swi_uid) and (args.flair_uid or env_flair_uid):
-                    swi = args.swi_uid or env_swi_uid
-                    flair = args.flair_uid or env_flair_uid
-                    logger.info(f"Using UIDs from combined sources: SWI='{swi}', FLAIR='{flair}'")
-                    settings = create_settings_from_uids(swi, flair)
-                # Try to complete patterns
-                elif (args.swi_pattern or env_swi_pattern) and (args.flair_pattern or env_flair_pattern):
-                    swi = args.swi_pattern or env_swi_pattern
-                    flair = args.flair_pattern or env_flair_pattern
-                    logger.info(f"Using patterns from combined sources: SWI='{swi}', FLAIR='{flair}'")
-                    settings = create_settings_from_patterns(swi, flair)
-                else:
-                    logger.warning("Falling back to task.json configuration.")
-                    settings = load_task_json(args.input_dir)
-                    logger.info("Configuration loaded and validated successfully")
-            # Check if only one pattern/UID is provided
-            elif args.swi_pattern or args.flair_pattern or args.swi_uid or args.flair_uid:
-                # Determine what's missing and what's provided
-                if args.swi_pattern:
-                    missing_type = "FLAIR pattern"
-                    provided_type = "SWI pattern"
-                elif args.flair_pattern:
-                    missing_type = "SWI pattern"
-                    provided_type = "FLAIR pattern"
-                elif args.swi_uid:
-                    missing_type = "FLAIR UID"
-                    provided_type = "SWI UID"
-                else:  # args.flair_uid
-                    missing_type = "SWI UID"
-                    provided_type = "FLAIR UID"
-                
-                logger.warning(f"Only {provided_type} was provided. Both are required.")
-                
-                # Check environment variables
-                env_swi_uid = os.environ.get('SWI_UID')
-                env_flair_uid = os.environ.get('FLAIR_UID')
-                env_swi_pattern = os.environ.get('SWI_PATTERN')
-                env_flair_pattern = os.environ.get('FLAIR_PATTERN')
-                
-                # Try to complete UIDs
-                if (args.swi_uid or env_swi_uid) and (args.flair_uid or env_flair_uid):
-                    swi = args.swi_uid or env_swi_uid
-                    flair = args.flair_uid or env_flair_uid
-                    logger.info(f"Using UIDs from combined sources: SWI='{swi}', FLAIR='{flair}'")
-                    settings = create_settings_from_uids(swi, flair)
-                # Try to complete patterns
-                elif (args.swi_pattern or env_swi_pattern) and (args.flair_pattern or env_flair_pattern):
-                    swi = args.swi_pattern or env_swi_pattern
-                    flair = args.flair_pattern or env_flair_pattern
-                    logger.info(f"Using patterns from combined sources: SWI='{swi}', FLAIR='{flair}'")
-                    settings = create_settings_from_patterns(swi, flair)
-                else:
-                    logger.warning(f"Falling back to task.json configuration.")
-                    settings = load_task_json(args.input_dir)
-                    logger.info("Configuration loaded and validated successfully")
-            else:
-                # Check FLAIRSTAR environment variables first (primary interface)
-                flairstar_swi_uid = os.environ.get('FLAIRSTAR_SWI_SCAN_ID')
-                flairstar_flair_uid = os.environ.get('FLAIRSTAR_FLAIR_SCAN_ID')
-                
-                # Check legacy environment variables for backward compatibility
-                env_swi_uid = os.environ.get('SWI_UID')
-                env_flair_uid = os.environ.get('FLAIR_UID')
-                env_swi_pattern = os.environ.get('SWI_PATTERN')
-                env_flair_pattern = os.environ.get('FLAIR_PATTERN')
-                
-                # Use FLAIRSTAR variables as primary, fall back to legacy if not available
-                if flairstar_swi_uid:
-                    env_swi_uid = flairstar_swi_uid
-                    logger.info("Using FLAIRSTAR_SWI_SCAN_ID environment variable")
-                if flairstar_flair_uid:
-                    env_flair_uid = flairstar_flair_uid
-                    logger.info("Using FLAIRSTAR_FLAIR_SCAN_ID environment variable")
-                
-                if env_swi_uid and env_flair_uid:
-                    logger.info(f"Using UIDs from environment variables: SWI='{env_swi_uid}', FLAIR='{env_flair_uid}'")
-                    settings = create_settings_from_uids(env_swi_uid, env_flair_uid)
-                    logger.info("UID settings created successfully")
-                elif env_swi_pattern and env_flair_pattern:
-                    logger.info(f"Using patterns from environment variables: SWI='{env_swi_pattern}', FLAIR='{env_flair_pattern}'")
-                    settings = create_settings_from_patterns(env_swi_pattern, env_flair_pattern)
-                    logger.info("Pattern settings created successfully")
-                else:
-                    logger.info("Loading task.json configuration...")
-                    settings = load_task_json(args.input_dir)
-                    logger.info("Configuration loaded and validated successfully")
+            # Wait for the staged copy before anything reads the series
+            if staging is not None:
+                staging.result()
+                scan_dir = str(staged_input_dir)
+                logger.info("Input directory staged successfully")
             
             # Step 2: Find matching DICOM series
             logger.info("Step 2: Scanning for matching DICOM series...")
-            series_dict = find_dicom_series(args.input_dir, settings)
+            series_dict = find_dicom_series(scan_dir, settings)
             
             if not series_dict:
                 raise ValueError("No matching DICOM series found in input directory")
@@ -408,7 +452,7 @@ def main():
             # Step 3: Initialize processor
             logger.info("Step 3: Initializing series processor...")
             processor = SeriesProcessor(
-                args.input_dir,
+                scan_dir,
                 output_dir,
                 temp_dir,
                 settings
@@ -423,6 +467,11 @@ def main():
                 
             logger.info("Series processing completed successfully")
             
+            # The intermediate NIFTI files are no longer needed; remove them in
+            # the background while the results are sent
+            cleanup_executor = ThreadPoolExecutor(max_workers=1)
+            cleanup_executor.submit(processor.cleanup)
+            
             # Step 5: DICOM sending (if configured)
             dicom_send_config = settings.get('dicom_send', {})
             if dicom_send_config:
@@ -442,11 +491,21 @@ def main():
             logger.info("All processing steps completed successfully")
                 
         finally:
+            # Make sure background staging and cleanup are finished before
+            # the temporary directory is removed
+            if stage_executor is not None:
+                stage_executor.shutdown(wait=True)
+            if cleanup_executor is not None:
+                cleanup_executor.shutdown(wait=True)
+            
             # Cleanup step
             logger.info("Cleanup: Removing temporary files...")
             if temp_dir.exists():
                 try:
-                    shutil.rmtree(temp_dir)
+                    if temp_context is not None:
+                        temp_context.cleanup()
+                    else:
+                        shutil.rmtree(temp_dir)
                     logger.info("Temporary directory removed successfully")
                 except Exception as e:
                     logger.error(f"Error cleaning up temporary directory: {str(e)}")
@@ -6,9 +6,24 @@ class BaseProcessor(ABC):
     
     def __init__(self, output_dir):
         self.output_dir = output_dir
-        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger = type(self).get_logger()
+    
+    @classmethod
+    def get_logger(cls):
+        """
+        Get the logger for this processor class, looked up once per class
+        
+        Returns:
+            logging.Logger: Logger named after the concrete processor class
+        """
+        # Look in the class's own namespace so subclasses don't inherit a parent's logger
+        cls_logger = cls.__dict__.get('_logger')
+        if cls_logger is None:
+            cls_logger = logging.getLogger(cls.__name__)
+            cls._logger = cls_logger
+        return cls_logger
     
     @abstractmethod
     def process(self, *args, **kwargs):
         """Abstract method that all processors must implement"""
-        pass 
\ No newline at end of file
+        pass 
@@ -5,10 +5,34 @@ import pydicom
 from converters.dicom_to_nifti import process_series
 from converters.nifti_to_dicom import nifti_to_dicom
 from .nifti_processor import NiftiProcessor
+from utils.rule_checker import RuleChecker
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pydicom.uid import generate_uid
 
 
+def _link_or_copy(src_path, dst_path):
+    """Hard link a file into place, copying only across filesystems or where links are unsupported"""
+    # The walk can reach files already in the output (e.g. when it lies in
+    # the input folder); those are in place and must not be replaced
+    if os.path.lexists(dst_path) and os.path.samefile(src_path, dst_path):
+        return
+    # Link or copy to a temporary name and rename it over the destination, so
+    # an existing destination (which may itself be a link to an input) is
+    # never written through, nor removed before its replacement exists
+    tmp_path = f"{dst_path}.{os.getpid()}.tmp"
+    try:
+        try:
+            os.link(src_path, tmp_path)
+        except (OSError, NotImplementedError):
+            shutil.copy2(src_path, tmp_path)
+        os.replace(tmp_path, dst_path)
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
 class SeriesProcessor:
     def __init__(self, in_folder, out_folder, temp_folder, settings):
         self.in_folder = Path(in_folder)
@@ -16,6 +40,12 @@ class SeriesProcessor:
         self.temp_folder = Path(temp_folder)
         self.settings = settings
         self.logger = logging.getLogger(__name__)
+        
+        # Shared by every series conversion in this run
+        processing_settings = settings.get("processing", {})
+        self.rule_checker = RuleChecker()
+        self.swi_pattern = processing_settings.get("swi_pattern", {})
+        self.flair_pattern = processing_settings.get("flair_pattern", {})
 
     def _copy_input_dicoms(self, first_series, second_series):
         """Copy all input DICOM series and converted FLAIR-STAR files to output directory"""
@@ -25,13 +55,23 @@ class SeriesProcessor:
             self.logger.info("Copying all input DICOM files...")
             input_files = []
             
-            for root, _, files in os.walk(self.in_folder):
-                for file in files:
-                    if file.endswith('.dcm'):
-                        src_path = Path(root) / file
-                        dst_path = self.out_folder / file
-                        shutil.copy2(src_path, dst_path)
-                        input_files.append(file)
+            # Walk with os.scandir so entry types come from the directory
+            # listing; same traversal as os.walk, symlinked dirs not followed
+            out_folder = str(self.out_folder)
+            stack = [str(self.in_folder)]
+            while stack:
+                try:
+                    entries = os.scandir(stack.pop())
+                except OSError:
+                    # Unreadable directories are skipped, as os.walk does
+                    continue
+                with entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.endswith('.dcm') and entry.is_file():
+                            _link_or_copy(entry.path, os.path.join(out_folder, entry.name))
+                            input_files.append(entry.name)
             
             self.logger.info(f"Successfully copied {len(input_files)} input DICOM files")
             return True
@@ -64,11 +104,11 @@ class SeriesProcessor:
             if not nifti_files:
                 return False
 
-            result_file = self._process_nifti_files(nifti_files)
-            if not result_file:
+            result_image = self._process_nifti_files(nifti_files)
+            if result_image is None:
                 return False
 
-            success = self._convert_to_dicom(result_file, swi_series[1])
+            success = self._convert_to_dicom(result_image, swi_series[1])
             if not success:
                 return False
                 
@@ -99,52 +139,20 @@ class SeriesProcessor:
         second_nifti_dir.mkdir(parents=True, exist_ok=True)
         
         try:
-            self.logger.info(f"Converting first series ({first_series[1]['description']})...")
-            self.logger.info(f"Number of files in first series: {len(first_series[1]['files'])}")
-            
-            for i, file in enumerate(first_series[1]['files'][:3]):
-                self.logger.info(f"First series file {i}: {file}")
-            
-            first_result = process_series(
-                first_series[1]['files'],
-                self.in_folder,
-                first_nifti_dir,
-                first_series[0],
-                self.settings
-            )
-            
-            if first_result:
-                self.logger.info(f"First series converted successfully: {first_result}")
-                first_nifti_files = list(first_nifti_dir.glob('**/*.nii.gz'))
-                self.logger.info(f"First series NIFTI files: {first_nifti_files}")
-            else:
-                self.logger.error("Failed to convert first series")
-                return None
-                
-            self.logger.info(f"Converting second series ({second_series[1]['description']})...")
-            self.logger.info(f"Number of files in second series: {len(second_series[1]['files'])}")
-            
-            for i, file in enumerate(second_series[1]['files'][:3]):
-                self.logger.info(f"Second series file {i}: {file}")
-                
-            second_result = process_series(
-                second_series[1]['files'],
-                self.in_folder,
-                second_nifti_dir,
-                second_series[0],
-                self.settings
-            )
-            
-            if second_result:
-                self.logger.info(f"Second series converted successfully: {second_result}")
-                second_nifti_files = list(second_nifti_dir.glob('**/*.nii.gz'))
-                self.logger.info(f"Second series NIFTI files: {second_nifti_files}")
+            # The two conversions read disjoint files and write to separate
+            # directories; dcm2niix runs as a subprocess, so threads overlap them
+            if self.settings.get('parallel_conversion', True):
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    first_future = executor.submit(self._convert_series, "First", first_series, first_nifti_dir)
+                    second_future = executor.submit(self._convert_series, "Second", second_series, second_nifti_dir)
+                    first_nifti, second_nifti = first_future.result(), second_future.result()
             else:
-                self.logger.error("Failed to convert second series")
+                first_nifti = self._convert_series("First", first_series, first_nifti_dir)
+                second_nifti = None
+                if first_nifti is not None:
+                    second_nifti = self._convert_series("Second", second_series, second_nifti_dir)
+            if first_nifti is None or second_nifti is None:
                 return None
-                
-            first_nifti = list(first_nifti_dir.glob('**/*.nii.gz'))
-            second_nifti = list(second_nifti_dir.glob('**/*.nii.gz'))
             
             if not first_nifti:
                 self.logger.error("No NIFTI file found for first series")
@@ -153,7 +161,7 @@ class SeriesProcessor:
                 self.logger.error("No NIFTI file found for second series")
                 return None
                 
-            return (str(first_nifti[0]), str(second_nifti[0]))
+            return (first_nifti[0], second_nifti[0])
             
         except Exception as e:
             self.logger.error(f"Error during conversion: {str(e)}")
@@ -162,8 +170,53 @@ class SeriesProcessor:
             return None
         
 
+    def _convert_series(self, label, series, nifti_dir):
+        """
+        Convert one matched series to NIFTI
+        
+        Args:
+            label (str): "First" or "Second", for logging
+            series (tuple): (series UID, series data)
+            nifti_dir (Path): Output directory for the NIFTI files
+            
+        Returns:
+            list: Paths of the NIFTI files written, or None if conversion failed
+        """
+        name = label.lower()
+        self.logger.info(f"Converting {name} series ({series[1]['description']})...")
+        self.logger.info(f"Number of files in {name} series: {len(series[1]['files'])}")
+        
+        for i, file in enumerate(series[1]['files'][:3]):
+            self.logger.info(f"{label} series file {i}: {file}")
+        
+        result = process_series(
+            series[1]['files'],
+            self.in_folder,
+            nifti_dir,
+            series[0],
+            self.settings,
+            rule_checker=self.rule_checker,
+            swi_pattern=self.swi_pattern,
+            flair_pattern=self.flair_pattern
+        )
+        
+        if not result:
+            self.logger.error(f"Failed to convert {name} series")
+            return None
+        self.logger.info(f"{label} series converted successfully: {result}")
+        
+        # dcm2niix writes straight into the output directory process_series
+        # returns, so a single listing of it finds the files
+        with os.scandir(result[0]) as entries:
+            nifti_files = [
+                entry.path for entry in entries
+                if entry.name.endswith('.nii.gz') and entry.is_file()
+            ]
+        self.logger.info(f"{label} series NIFTI files: {nifti_files}")
+        return nifti_files
+
     def _process_nifti_files(self, nifti_files):
-        """Process NIFTI files using NiftiProcessor"""
+        """Process NIFTI files using NiftiProcessor, returning the fused in-memory image"""
         if not nifti_files:
             return None
             
@@ -173,16 +226,19 @@ class SeriesProcessor:
         
         try:
             processor = NiftiProcessor(str(result_dir))
-            return processor.process(first_nifti, second_nifti)
+            result_file = processor.process(first_nifti, second_nifti)
+            # Hand the fused image over in memory rather than reading the file back
+            return processor.result_image if result_file else None
         except Exception as e:
             self.logger.error(f"Failed to process images: {str(e)}")
             return None
 
     def _convert_to_dicom(self, nifti_file, series):
-        """Convert NIFTI result back to DICOM"""
+        """Convert NIFTI result (a path or in-memory image) back to DICOM"""
         try:
             reference_dicom = pydicom.dcmread(
                 str(self.in_folder / series['files'][0]),
+                stop_before_pixels=True,
                 force=True
             )
             result_series_uid = generate_uid()
@@ -190,7 +246,8 @@ class SeriesProcessor:
                 nifti_file, 
                 reference_dicom, 
                 self.out_folder, 
-                result_series_uid
+                result_series_uid,
+                work_dir=str(self.temp_folder)
             )
             return True
         except Exception as e:
@@ -211,8 +268,8 @@ class SeriesProcessor:
                 
         return True
 
-    def _cleanup(self):
-        """Clean up temporary files"""
+    def cleanup(self):
+        """Clean up the temporary NIFTI and processing files once the result is written"""
         self.logger.info("Cleaning up temporary files")
         shutil.rmtree(self.temp_folder / "temp_nifti", ignore_errors=True)
         shutil.rmtree(self.temp_folder / "processing_result", ignore_errors=True)
\ No newline at end of file
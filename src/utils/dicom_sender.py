@@ -1,6 +1,6 @@
 import os
 import logging
-import pydicom
+from concurrent.futures import ThreadPoolExecutor
 from pynetdicom import AE, StoragePresentationContexts
 
 logger = logging.getLogger(__name__)
@@ -31,22 +31,62 @@ class DICOMSender:
             logger.info("DICOM sending is disabled in configuration")
             return True
 
+        destinations = self.config.get('destinations', [])
+        if not destinations:
+            return True
+
+        # List the files once for all destinations
+        filepaths = self._list_files(dicom_directory)
+
+        # Sends are network bound and every destination has its own
+        # association, so all destinations are served concurrently
         success = True
-        for destination in self.config.get('destinations', []):
-            try:
-                success &= self._send_to_destination(dicom_directory, destination)
-            except Exception as e:
-                logger.error(f"Error sending to {destination['name']}: {str(e)}")
-                success = False
+        with ThreadPoolExecutor(max_workers=len(destinations)) as executor:
+            futures = [
+                (destination, executor.submit(self._send_to_destination, filepaths, destination))
+                for destination in destinations
+            ]
+            for destination, future in futures:
+                try:
+                    success &= future.result()
+                except Exception as e:
+                    logger.error(f"Error sending to {destination['name']}: {str(e)}")
+                    success = False
 
         return success
 
-    def _send_to_destination(self, dicom_directory, destination):
+    @staticmethod
+    def _list_files(dicom_directory):
         """
-        Send DICOM files to a specific destination
+        List all files in and under a directory
         
         Args:
             dicom_directory (str): Directory containing DICOM files
+            
+        Returns:
+            list: File paths
+        """
+        filepaths = []
+        stack = [str(dicom_directory)]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        filepaths.append(entry.path)
+        return filepaths
+
+    def _send_to_destination(self, filepaths, destination):
+        """
+        Send DICOM files to a specific destination
+        
+        Args:
+            filepaths (list): Paths of the DICOM files to send
             destination (dict): Destination configuration
             
         Returns:
@@ -66,23 +106,22 @@ class DICOMSender:
                 return False
 
             success = True
-            for root, _, files in os.walk(dicom_directory):
-                for filename in files:
-                    try:
-                        filepath = os.path.join(root, filename)
-                        ds = pydicom.dcmread(filepath)
-                        
-                        status = assoc.send_c_store(ds)
-                        
-                        if status:
-                            logger.debug(f"Successfully sent {filename}")
-                        else:
-                            logger.error(f"Failed to send {filename}")
-                            success = False
-                            
-                    except Exception as e:
-                        logger.error(f"Error processing {filename}: {str(e)}")
+            for filepath in filepaths:
+                filename = os.path.basename(filepath)
+                try:
+                    # Given a path, pynetdicom sends the encoded dataset straight
+                    # from the file instead of decoding and re-encoding it
+                    status = assoc.send_c_store(filepath)
+                    
+                    if status:
+                        logger.debug("Successfully sent %s", filename)
+                    else:
+                        logger.error(f"Failed to send {filename}")
                         success = False
+                        
+                except Exception as e:
+                    logger.error(f"Error processing {filename}: {str(e)}")
+                    success = False
 
             assoc.release()
             return success
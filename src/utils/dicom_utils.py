@@ -1,74 +1,150 @@
 import os
+import re
 import pydicom
+from pydicom.fileset import FileSet
 import logging
 from collections import defaultdict
 from pathlib import Path
 from datetime import datetime
 from .rule_checker import RuleChecker
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 import traceback
 
 logger = logging.getLogger(__name__)
 
+# Tags needed to group files into series and pick the latest match; the tags
+# the pattern rules inspect are added per scan
+SERIES_HEADER_TAGS = (
+    'SeriesInstanceUID',
+    'SeriesDescription',
+    'AcquisitionDate',
+    'AcquisitionTime',
+    'SeriesDate',
+    'SeriesTime',
+    'StudyDate',
+    'StudyTime',
+)
+
+# Date and time tags in order of preference: Acquisition, Series, Study
+_DATE_TAGS = (0x00080022, 0x00080021, 0x00080020)
+_TIME_TAGS = (0x00080032, 0x00080031, 0x00080030)
+
+def _first_present(dcm, tags):
+    """Value of the first of the given tags present in dcm, looked up by tag number"""
+    for tag in tags:
+        elem = dcm.get(tag)
+        if elem is not None:
+            return elem.value
+    return ''
+
 def get_series_timestamp(dcm):
     """Get timestamp from DICOM file for sorting"""
     try:
-        # Try to get acquisition time
-        date_str = getattr(dcm, 'AcquisitionDate', getattr(dcm, 'SeriesDate', getattr(dcm, 'StudyDate', '')))
-        time_str = getattr(dcm, 'AcquisitionTime', getattr(dcm, 'SeriesTime', getattr(dcm, 'StudyTime', '')))
+        # Try to get acquisition time, falling back to series and study time
+        date_str = _first_present(dcm, _DATE_TAGS)
+        time_str = _first_present(dcm, _TIME_TAGS)
+        
+        if not date_str:
+            return datetime.min
         
-        if date_str and time_str:
-            # Handle time format with fractional seconds
-            time_str = time_str.split('.')[0]
+        # DA and TM are fixed width (YYYYMMDD and HH[MM[SS[.F]]]), so they are
+        # sliced directly instead of going through strptime's format parsing
+        date_str = str(date_str).strip()
+        if len(date_str) != 8 or not date_str.isdigit():
+            raise ValueError(f"Invalid DICOM date: {date_str}")
+        date_parts = (int(date_str[0:4]), int(date_str[4:6]), int(date_str[6:8]))
+        
+        # Handle time format with fractional seconds
+        time_str = str(time_str).split('.')[0].strip()
+        if time_str and len(time_str) in (2, 4, 6) and time_str.isdigit():
             try:
-                return datetime.strptime(f"{date_str}{time_str}", '%Y%m%d%H%M%S')
+                return datetime(*date_parts, *(int(time_str[i:i + 2]) for i in range(0, len(time_str), 2)))
             except ValueError:
-                return datetime.strptime(date_str, '%Y%m%d')
-        elif date_str:
-            return datetime.strptime(date_str, '%Y%m%d')
-        else:
-            return datetime.min
+                pass
+        return datetime(*date_parts)
     except Exception as e:
         logger.debug(f"Error getting timestamp: {str(e)}")
         return datetime.min
 
+# A path component of only digits and dots, with more than five dots
+_PATH_UID_RE = re.compile(
+    r'(?:^|{sep})((?:\d*\.){{6,}}\d*)(?={sep}|$)'.format(sep=re.escape(os.sep))
+)
+
 def extract_series_uid_from_path(filepath):
     """Try to extract the SeriesInstanceUID from the file path"""
-    # Convert to string if it's a Path object
-    if isinstance(filepath, Path):
-        filepath = str(filepath)
-    
-    # Split the path into components
-    parts = filepath.split(os.sep)
-    
-    # Look for a component that looks like a UID (has many dots and numbers)
-    for part in parts:
-        if part.count('.') > 5 and all(c.isdigit() or c == '.' for c in part):
-            return part
+    # Look for a component that looks like a UID (has many dots and numbers),
+    # in one regex pass over the whole path
+    match = _PATH_UID_RE.search(os.fspath(filepath))
+    return match.group(1) if match else None
+
+# Signatures of formats that commonly sit next to DICOMs in clinical exports
+NON_DICOM_SIGNATURES = (
+    b'\xff\xd8\xff',  # JPEG
+    b'\x89PNG',       # PNG
+    b'%PDF',          # PDF
+    b'GIF8',          # GIF
+    b'PK\x03\x04',    # ZIP
+)
+
+def _read_file_signature(filepath):
+    """
+    Classify a file from its first 132 bytes
     
-    return None
+    Returns:
+        str: 'dicom' if the DICM prefix follows the preamble, 'other' for a
+        known non-DICOM signature, 'unknown' otherwise (e.g. a DICOM
+        dataset written without preamble)
+    """
+    with open(filepath, 'rb') as f:
+        head = f.read(132)
+    if head[128:132] == b'DICM':
+        return 'dicom'
+    if head.startswith(NON_DICOM_SIGNATURES):
+        return 'other'
+    return 'unknown'
 
-def safe_dcm_read(filepath):
-    """Try multiple approaches to read a DICOM file"""
+def safe_dcm_read(filepath, specific_tags=None):
+    """
+    Try multiple approaches to read a DICOM file
+    
+    Args:
+        filepath (str): Path to the DICOM file
+        specific_tags (list): Optional tags to limit parsing to; every other
+            element is skipped, which keeps header scans cheap
+        
+    Returns:
+        pydicom.dataset.FileDataset: DICOM header, or None if unreadable
+    """
     try:
+        # Check the signature first: known non-DICOM files are skipped without
+        # parsing, and files without the DICM prefix go straight to force=True
+        signature = _read_file_signature(str(filepath))
+        if signature == 'other':
+            logger.debug("Skipping non-DICOM file: %s", filepath)
+            return None
+        
         # First attempt - normal read with force=False
-        try:
-            return pydicom.dcmread(str(filepath), stop_before_pixels=True, force=False)
-        except Exception as e:
-            logger.debug(f"First attempt to read DICOM failed: {str(e)}")
+        if signature == 'dicom':
+            try:
+                return pydicom.dcmread(str(filepath), stop_before_pixels=True, force=False, specific_tags=specific_tags)
+            except Exception as e:
+                logger.debug("First attempt to read DICOM failed: %s", e)
             
         # Second attempt - force=True
         try:
-            return pydicom.dcmread(str(filepath), stop_before_pixels=True, force=True)
+            return pydicom.dcmread(str(filepath), stop_before_pixels=True, force=True, specific_tags=specific_tags)
         except Exception as e:
-            logger.debug(f"Second attempt to read DICOM with force=True failed: {str(e)}")
+            logger.debug("Second attempt to read DICOM with force=True failed: %s", e)
             
         # Third attempt - try reading with different transfer syntax
         try:
-            dataset = pydicom.dcmread(str(filepath), stop_before_pixels=True, force=True)
+            dataset = pydicom.dcmread(str(filepath), stop_before_pixels=True, force=True, specific_tags=specific_tags)
             dataset.file_meta.TransferSyntaxUID = pydicom.uid.ExplicitVRLittleEndian
             return dataset
         except Exception as e:
-            logger.debug(f"Third attempt with different transfer syntax failed: {str(e)}")
+            logger.debug("Third attempt with different transfer syntax failed: %s", e)
             
         # Final attempt - read specific tags only
         try:
@@ -76,36 +152,230 @@ def safe_dcm_read(filepath):
             dataset = pydicom.dcmread(str(filepath), specific_tags=tags, force=True)
             return dataset
         except Exception as e:
-            logger.debug(f"Final attempt with specific tags failed: {str(e)}")
+            logger.debug("Final attempt with specific tags failed: %s", e)
             
         raise ValueError("All DICOM reading attempts failed")
             
     except Exception as e:
-        logger.debug(f"All attempts to read DICOM file {filepath} failed: {str(e)}")
+        logger.debug("All attempts to read DICOM file %s failed: %s", filepath, e)
+        return None
+
+# Header datasets already parsed in this run, keyed by (absolute path, mtime,
+# size) and stored with the tags they were read with (None = all tags)
+_header_cache = {}
+
+def cached_dcm_read(filepath, specific_tags=None):
+    """
+    Read a DICOM header through safe_dcm_read, reusing an earlier parse of
+    the same unchanged file when it covered all requested tags
+    
+    Args:
+        filepath (str): Path to the DICOM file
+        specific_tags (list): Optional tags to limit parsing to
+        
+    Returns:
+        pydicom.dataset.FileDataset: DICOM header, or None if unreadable
+    """
+    try:
+        stat = os.stat(filepath)
+    except OSError as e:
+        logger.debug("Cannot stat DICOM file %s: %s", filepath, e)
         return None
+    key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+    
+    cached = _header_cache.get(key)
+    if cached is not None:
+        cached_tags, dataset = cached
+        if cached_tags is None or (specific_tags is not None and set(specific_tags) <= cached_tags):
+            return dataset
+    
+    dataset = safe_dcm_read(filepath, specific_tags)
+    if dataset is not None:
+        _header_cache[key] = (None if specific_tags is None else frozenset(specific_tags), dataset)
+    return dataset
 
 def get_series_uid(dcm, filepath):
     """Extract SeriesInstanceUID using different methods"""
     if dcm is None:
         return None
     
-    # Method 1: Get from DICOM attribute
+    # Method 1: Get from the DICOM element, looked up by tag number so the
+    # keyword does not have to be resolved on every file
     try:
-        if hasattr(dcm, 'SeriesInstanceUID'):
-            return dcm.SeriesInstanceUID
+        elem = dcm.get(0x0020000E)  # Series Instance UID tag
+        if elem is not None:
+            return elem.value
     except Exception as e:
-        logger.debug(f"Failed to get SeriesInstanceUID from DICOM attribute: {str(e)}")
+        logger.debug("Failed to get SeriesInstanceUID from DICOM elements: %s", e)
     
-    # Method 2: Get from DICOM elements
+    # Method 2: Extract from directory name
+    return extract_series_uid_from_path(filepath)
+
+def _read_series_header(filepath, header_tags):
+    """
+    Read the header of one candidate file and resolve its series.
+    
+    Args:
+        filepath (str): Path to the DICOM file
+        header_tags (list): Tags to limit parsing to
+        
+    Returns:
+        tuple: (DICOM dataset, SeriesInstanceUID), or (None, None) if the file
+        is unreadable or has no usable series UID
+    """
     try:
-        series_tag = (0x0020, 0x000e)  # Series Instance UID tag
-        if series_tag in dcm:
-            return dcm[series_tag].value
+        dcm = cached_dcm_read(str(filepath), header_tags)
+        if dcm is None:
+            return None, None
+            
+        # Try to get SeriesInstanceUID using multiple methods
+        series_uid = get_series_uid(dcm, filepath)
+        if not series_uid:
+            # Last resort: just use the parent directory name if it looks like a UID
+            parent_dir = os.path.basename(os.path.dirname(filepath))
+            if parent_dir.count('.') > 5:
+                series_uid = parent_dir
+                logger.debug("Using parent directory as UID: %s", series_uid)
+            else:
+                logger.debug("Skipping file %s: No SeriesInstanceUID found in any method", filepath)
+                return None, None
+        
+        return dcm, series_uid
     except Exception as e:
-        logger.debug(f"Failed to get SeriesInstanceUID from DICOM elements: {str(e)}")
+        logger.debug("Error processing file %s: %s", filepath, e)
+        # Formatting the traceback is the expensive part, so skip it entirely
+        # unless DEBUG output is actually wanted
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(traceback.format_exc())
+        return None, None
+
+# Tags read from every candidate file to group it into its series
+SERIES_UID_TAGS = ('SeriesInstanceUID',)
+
+def _scan_series_uid(filepath):
+    """
+    Resolve the series of one candidate file, for use in worker processes
     
-    # Method 3: Extract from directory name
-    return extract_series_uid_from_path(filepath)
+    Only the UID string is returned, as datasets are costly to pickle back.
+    
+    Args:
+        filepath (str): Path to the DICOM file
+        
+    Returns:
+        str: SeriesInstanceUID, or None if the file is unreadable or has none
+    """
+    return _read_series_header(filepath, SERIES_UID_TAGS)[1]
+
+# From this many candidates on, the UID pass is parsed in worker processes;
+# below it, process startup costs more than the parsing saved
+PROCESS_SCAN_MIN_FILES = 1000
+
+# File extensions treated as DICOM during discovery
+DICOM_EXTENSIONS = ('.dcm', '.ima', '.dicom')
+
+# Header reads are mostly waiting on small file reads, so more threads than
+# cores keep the storage queue full; capped for slow network shares
+HEADER_READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+def _scan_tree(directory):
+    """
+    Collect all subdirectories and candidate DICOM files in one traversal
+    
+    Uses os.scandir with an explicit stack, so entry types come from the
+    cached directory entries. Order and symlink handling match a top-down
+    os.walk: symlinked directories are listed but not descended into.
+    
+    Args:
+        directory (str): Root directory
+        
+    Returns:
+        tuple: (list of subdirectory paths, list of DICOM file paths)
+    """
+    all_dirs = []
+    dicom_files = []
+    stack = [str(directory)]
+    while stack:
+        current = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        all_dirs.append(entry.path)
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                    elif entry.name.lower().endswith(DICOM_EXTENSIONS):
+                        dicom_files.append(entry.path)
+        except OSError as e:
+            logger.debug("Cannot list directory %s: %s", current, e)
+            continue
+        # Reversed so the first subdirectory is visited next, as in os.walk
+        stack.extend(reversed(subdirs))
+    return all_dirs, dicom_files
+
+def _files_under(tree_files, directory):
+    """
+    Select the files of a _scan_tree listing that lie in and under a directory
+    
+    Args:
+        tree_files (list): DICOM file paths from _scan_tree, in walk order
+        directory (str): Directory from the same scan
+        
+    Returns:
+        list: Matching file paths, in the order os.walk(directory) yields them
+    """
+    # Symlinked directories were not descended into by the scan, so list them now
+    if os.path.islink(directory):
+        return _scan_tree(directory)[1]
+    prefix = os.path.join(directory, '')
+    return [f for f in tree_files if f.startswith(prefix)]
+
+def _single_uid_rule(pattern_rules):
+    """Return the target UID if a pattern is a single SeriesInstanceUID equals rule"""
+    rules = pattern_rules.get('rules', [])
+    if (len(rules) == 1 and
+        rules[0].get('tag') == 'SeriesInstanceUID' and
+        rules[0].get('operation') == 'equals'):
+        return rules[0].get('value')
+    return None
+
+def _dicomdir_candidates(directory, series_uids):
+    """
+    List the files of the given series from a DICOMDIR index
+    
+    Args:
+        directory (Path): Input directory containing the DICOMDIR
+        series_uids (list): SeriesInstanceUIDs to look up
+        
+    Returns:
+        list: Paths of the referenced files, or None if the index is missing,
+        unreadable or does not reference every one of the series
+    """
+    dicomdir_path = directory / 'DICOMDIR'
+    if not dicomdir_path.is_file():
+        return None
+    
+    try:
+        fileset = FileSet(pydicom.dcmread(str(dicomdir_path)))
+        candidates = []
+        for series_uid in series_uids:
+            instances = fileset.find(SeriesInstanceUID=series_uid)
+            if not instances:
+                # A partial or stale index; only a scan finds the other series
+                logger.info(f"DICOMDIR index does not list series {series_uid}, scanning directory instead")
+                return None
+            for instance in instances:
+                candidates.append(os.path.join(str(directory), os.path.relpath(instance.path, fileset.path)))
+    except Exception as e:
+        logger.warning(f"Could not use DICOMDIR index, scanning directory instead: {str(e)}")
+        return None
+    
+    logger.info(f"Found {len(candidates)} files for target UIDs in DICOMDIR index")
+    return candidates
 
 def find_dicom_series(directory, settings):
     """
@@ -136,216 +406,210 @@ def find_dicom_series(directory, settings):
     logger.info(f"Scanning directory {directory} for DICOM files")
     logger.info(f"Looking for patterns in settings: {settings.get('processing', {}).keys()}")
     
-    # Get the target UIDs we're looking for
-    swi_uid = None
-    flair_uid = None
+    # Get the target UIDs we're looking for, per series type
     proc_settings = settings.get('processing', {})
-    
-    if 'swi_pattern' in proc_settings and 'rules' in proc_settings['swi_pattern']:
-        for rule in proc_settings['swi_pattern']['rules']:
+    target_series = {}
+    for label, pattern_name in (('SWI', 'swi_pattern'), ('FLAIR', 'flair_pattern')):
+        target_series[label] = None
+        for rule in proc_settings.get(pattern_name, {}).get('rules', []):
             if rule.get('tag') == 'SeriesInstanceUID' and rule.get('operation') == 'equals':
-                swi_uid = rule.get('value')
-                logger.info(f"Looking for SWI UID: {swi_uid}")
-                break
-                
-    if 'flair_pattern' in proc_settings and 'rules' in proc_settings['flair_pattern']:
-        for rule in proc_settings['flair_pattern']['rules']:
-            if rule.get('tag') == 'SeriesInstanceUID' and rule.get('operation') == 'equals':
-                flair_uid = rule.get('value')
-                logger.info(f"Looking for FLAIR UID: {flair_uid}")
+                target_series[label] = rule.get('value')
+                logger.info(f"Looking for {label} UID: {target_series[label]}")
                 break
+    swi_uid = target_series['SWI']
+    flair_uid = target_series['FLAIR']
     
     rule_checker = RuleChecker()
     patterns = settings.get('processing', {})
     
-    # Log all subdirectories for debugging
-    all_dirs = []
-    for root, dirs, _ in os.walk(directory):
-        for dir_name in dirs:
-            all_dirs.append(os.path.join(root, dir_name))
-    logger.info(f"Found {len(all_dirs)} subdirectories to search")
-    
-    # Check if our target UIDs are in the directory names
-    if swi_uid:
-        matching_dirs = [d for d in all_dirs if swi_uid in d]
-        logger.info(f"Found {len(matching_dirs)} directories containing SWI UID")
-        if matching_dirs:
-            for d in matching_dirs[:3]:  # Show first 3 matches
-                logger.info(f"  - {d}")
+    # Only the series grouping tags and the tags the rules inspect are parsed
+    header_tags = list(dict.fromkeys([
+        *SERIES_HEADER_TAGS,
+        *rule_checker.required_tags(
+            proc_settings.get('swi_pattern', {}),
+            proc_settings.get('flair_pattern', {})
+        )
+    ]))
     
-    if flair_uid:
-        matching_dirs = [d for d in all_dirs if flair_uid in d]
-        logger.info(f"Found {len(matching_dirs)} directories containing FLAIR UID")
-        if matching_dirs:
-            for d in matching_dirs[:3]:  # Show first 3 matches
-                logger.info(f"  - {d}")
+    # Walk the tree at most once, for both the subdirectories (logged and used
+    # for synthetic entries) and the candidate DICOM files. The walk only
+    # happens when something needs it, so a usable DICOMDIR index avoids it
+    scanned_tree = None
+    
+    def scan_tree():
+        nonlocal scanned_tree
+        if scanned_tree is None:
+            scanned_tree = _scan_tree(directory)
+            logger.info(f"Found {len(scanned_tree[0])} subdirectories to search")
+        return scanned_tree
+    
+    # Scanned paths all start with the input directory, so relative paths are
+    # a string slice rather than an os.path.relpath call per file
+    dir_prefix = os.path.join(str(directory), '')
+    prefix_len = len(dir_prefix)
+    
+    def rel_path(filepath):
+        if filepath.startswith(dir_prefix):
+            return filepath[prefix_len:]
+        return os.path.relpath(filepath, str(directory))
     
-    dcm_count = 0
     dcm_with_uid_count = 0
     series_files = defaultdict(list)
     series_info = {}
     
-    # Store a mapping of extracted UIDs to files for thorough debugging
+    # Store a few example files per extracted UID for thorough debugging.
+    # They are only logged when a target UID is missing, so they are not
+    # collected at all without a target UID or with INFO logging off
     found_uids = defaultdict(list)
+    collect_examples = bool(swi_uid or flair_uid) and logger.isEnabledFor(logging.INFO)
+    
+    # When both patterns only select a SeriesInstanceUID, a DICOMDIR index
+    # (if present and listing both series) names their files directly and
+    # the tree walk is skipped
+    candidates = None
+    target_uids = [_single_uid_rule(proc_settings.get(name, {})) for name in ('swi_pattern', 'flair_pattern')]
+    if all(target_uids):
+        candidates = _dicomdir_candidates(directory, target_uids)
     
-    # First pass: collect all series
-    for root, _, files in os.walk(directory):
-        root_path = Path(root)
-        for filename in files:
-            if not filename.lower().endswith(('.dcm', '.ima', '.dicom')):
+    # First pass: collect all series. Every file is only parsed for its
+    # SeriesInstanceUID; the full header (description, timestamps and rule
+    # tags) is read once per series, from its first file. UID parsing is
+    # spread over worker processes for large trees, where pydicom's Python
+    # parsing would otherwise serialise on the GIL, and over threads for small
+    # ones. Results come back in walk order and are aggregated here, so the
+    # bookkeeping needs no locking
+    if candidates is None:
+        candidates = scan_tree()[1]
+    dcm_count = len(candidates)
+    series_first = {}
+    
+    if dcm_count >= PROCESS_SCAN_MIN_FILES:
+        n_workers = os.cpu_count() or 1
+        uid_executor = ProcessPoolExecutor(max_workers=n_workers)
+        chunksize = max(1, min(64, dcm_count // (n_workers * 4)))
+    else:
+        uid_executor = ThreadPoolExecutor(max_workers=HEADER_READ_WORKERS)
+        chunksize = 1
+    with uid_executor:
+        series_uids = uid_executor.map(_scan_series_uid, candidates, chunksize=chunksize)
+        for filepath, series_uid in zip(candidates, series_uids):
+            if series_uid is None:
                 continue
-                
-            dcm_count += 1
-            filepath = root_path / filename
             
-            # Try to read DICOM file with multiple approaches
-            try:
-                dcm = safe_dcm_read(str(filepath))
-                if dcm is None:
-                    continue
-                    
-                # Try to get SeriesInstanceUID using multiple methods
-                series_uid = get_series_uid(dcm, filepath)
-                if not series_uid:
-                    # Last resort: just use the parent directory name if it looks like a UID
-                    parent_dir = os.path.basename(os.path.dirname(filepath))
-                    if parent_dir.count('.') > 5:
-                        series_uid = parent_dir
-                        logger.debug(f"Using parent directory as UID: {series_uid}")
-                    else:
-                        logger.debug(f"Skipping file {filepath}: No SeriesInstanceUID found in any method")
-                        continue
-                
-                dcm_with_uid_count += 1
-                
-                # Add to our debugging map
-                found_uids[series_uid].append(str(filepath))
-                
-                # Special handling for the specific UIDs we're looking for
-                if series_uid == swi_uid or series_uid == flair_uid:
-                    logger.info(f"Found exact match for target UID: {series_uid} in file {filepath}")
-                
-                rel_path = filepath.relative_to(directory)
-                series_files[series_uid].append(str(rel_path))
-                
-                if series_uid not in series_info:
-                    series_desc = getattr(dcm, 'SeriesDescription', 'Unknown')
-                    logger.debug(f"Found series: {series_uid} - {series_desc}")
-                    series_info[series_uid] = {
-                        'description': series_desc,
-                        'first_file': dcm,
-                        'timestamp': get_series_timestamp(dcm)
-                    }
-            except Exception as e:
-                logger.debug(f"Error processing file {filepath}: {str(e)}")
-                logger.debug(traceback.format_exc())
-                continue
+            dcm_with_uid_count += 1
+            
+            # Add to our debugging map, capped at the examples that get logged
+            if collect_examples and len(found_uids[series_uid]) < 3:
+                found_uids[series_uid].append(filepath)
+            
+            series_files[series_uid].append(rel_path(filepath))
+            
+            if series_uid not in series_first:
+                series_first[series_uid] = filepath
+    
+    # Full header of the first file of each series. These reads stay in this
+    # process, where the header cache lets process_series reuse them
+    with ThreadPoolExecutor(max_workers=HEADER_READ_WORKERS) as executor:
+        first_files = list(series_first.values())
+        full_headers = executor.map(partial(_read_series_header, header_tags=header_tags), first_files)
+        for (series_uid, filepath), (dcm, _) in zip(series_first.items(), full_headers):
+            if dcm is None:
+                # Keep the series with what the UID pass could read
+                dcm, _ = _read_series_header(filepath, SERIES_UID_TAGS)
+            series_desc = getattr(dcm, 'SeriesDescription', 'Unknown')
+            logger.debug("Found series: %s - %s", series_uid, series_desc)
+            series_info[series_uid] = {
+                'description': series_desc,
+                'first_file': dcm,
+                'timestamp': get_series_timestamp(dcm)
+            }
     
     logger.info(f"Scanned {dcm_count} DICOM files, found {dcm_with_uid_count} with UIDs")
     logger.info(f"Found {len(series_info)} unique series")
     
-    # Log all found series for debugging
-    logger.info("Found series UIDs:")
-    for uid in sorted(series_info.keys()):
-        info = series_info[uid]
-        logger.info(f"  - {uid}: {info['description']} ({len(series_files[uid])} files)")
+    # One summary line per target UID rather than one line per matching file
+    for target_uid in (swi_uid, flair_uid):
+        if target_uid and target_uid in series_first:
+            logger.info(f"Found exact match for target UID: {target_uid} in {len(series_files[target_uid])} files")
     
-    # If our target UIDs are found directly in the directory structure,
-    # create a synthetic series entry for each
-    if swi_uid and swi_uid not in series_info:
-        matching_dirs = [d for d in all_dirs if swi_uid in d]
-        if matching_dirs:
-            logger.info(f"Creating synthetic entry for SWI UID from directory: {swi_uid}")
-            # Find all DICOM files in and under this directory
-            found_files = []
-            swi_dir = matching_dirs[0]
-            for root, _, files in os.walk(swi_dir):
-                for file in files:
-                    if file.lower().endswith(('.dcm', '.ima', '.dicom')):
-                        found_files.append(os.path.join(root, file))
-            
-            if found_files:
-                # Use the first file to get some metadata
-                try:
-                    dcm = safe_dcm_read(found_files[0])
-                    if dcm:
-                        series_info[swi_uid] = {
-                            'description': getattr(dcm, 'SeriesDescription', 'SWI Series'),
-                            'first_file': dcm,
-                            'timestamp': get_series_timestamp(dcm)
-                        }
-                        # Add all files to this series
-                        for file in found_files:
-                            rel_path = os.path.relpath(file, str(directory))
-                            series_files[swi_uid].append(rel_path)
-                except Exception as e:
-                    logger.error(f"Error creating synthetic SWI entry: {str(e)}")
+    # Log all found series for debugging; large exports can hold thousands
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Found series UIDs:")
+        for uid in sorted(series_info.keys()):
+            info = series_info[uid]
+            logger.debug(f"  - {uid}: {info['description']} ({len(series_files[uid])} files)")
     
-    if flair_uid and flair_uid not in series_info:
-        matching_dirs = [d for d in all_dirs if flair_uid in d]
+    # If our target UIDs are found directly in the directory structure,
+    # create a synthetic series entry for each. Directory names are only
+    # searched for targets that no file header provided
+    for label, target_uid in target_series.items():
+        if not target_uid or target_uid in series_info:
+            continue
+        all_dirs, tree_files = scan_tree()
+        matching_dirs = [d for d in all_dirs if target_uid in d]
+        logger.info(f"Found {len(matching_dirs)} directories containing {label} UID")
+        for d in matching_dirs[:3]:  # Show first 3 matches
+            logger.info(f"  - {d}")
         if matching_dirs:
-            logger.info(f"Creating synthetic entry for FLAIR UID from directory: {flair_uid}")
+            logger.info(f"Creating synthetic entry for {label} UID from directory: {target_uid}")
             # Find all DICOM files in and under this directory
-            found_files = []
-            flair_dir = matching_dirs[0]
-            for root, _, files in os.walk(flair_dir):
-                for file in files:
-                    if file.lower().endswith(('.dcm', '.ima', '.dicom')):
-                        found_files.append(os.path.join(root, file))
+            found_files = _files_under(tree_files, matching_dirs[0])
             
             if found_files:
                 # Use the first file to get some metadata
                 try:
-                    dcm = safe_dcm_read(found_files[0])
+                    # Cached, so process_series reuses this parse for the same file
+                    dcm = cached_dcm_read(found_files[0], header_tags)
                     if dcm:
-                        series_info[flair_uid] = {
-                            'description': getattr(dcm, 'SeriesDescription', 'FLAIR Series'),
+                        series_info[target_uid] = {
+                            'description': getattr(dcm, 'SeriesDescription', f'{label} Series'),
                             'first_file': dcm,
                             'timestamp': get_series_timestamp(dcm)
                         }
                         # Add all files to this series
-                        for file in found_files:
-                            rel_path = os.path.relpath(file, str(directory))
-                            series_files[flair_uid].append(rel_path)
+                        series_files[target_uid].extend(rel_path(file) for file in found_files)
                 except Exception as e:
-                    logger.error(f"Error creating synthetic FLAIR entry: {str(e)}")
+                    logger.error(f"Error creating synthetic {label} entry: {str(e)}")
     
     # If we found any UIDs at all but not the ones we're looking for, do a more thorough search
     if dcm_with_uid_count > 0 and ((swi_uid and swi_uid not in series_info) or (flair_uid and flair_uid not in series_info)):
         # Log all UIDs and their counts
         logger.info("All UIDs found in dataset:")
         for uid, files in found_uids.items():
-            logger.info(f"  - {uid}: {len(files)} files")
+            logger.info(f"  - {uid}: {len(series_files[uid])} files")
             # Show example paths for the first few files
-            for file in files[:3]:
+            for file in files:
                 logger.info(f"    - {file}")
     
-    # Second pass: match patterns and handle multiple matches
+    # Second pass: match patterns and handle multiple matches. Patterns that
+    # only select a SeriesInstanceUID are a direct lookup; the rest go through
+    # the rule checker for every series
+    uid_patterns = []
+    rule_patterns = []
+    for pattern_name, pattern_rules in patterns.items():
+        if pattern_name not in ('swi_pattern', 'flair_pattern'):
+            continue
+        target_uid = _single_uid_rule(pattern_rules)
+        if target_uid is not None:
+            uid_patterns.append((pattern_name, target_uid))
+        else:
+            rule_patterns.append((pattern_name, pattern_rules))
+    
+    for pattern_name, target_uid in uid_patterns:
+        info = series_info.get(target_uid)
+        if info is not None:
+            logger.info(f"Series {target_uid} matches pattern {pattern_name} by direct UID comparison")
+            pattern_series[pattern_name].append({
+                'series_uid': target_uid,
+                'description': info['description'],
+                'timestamp': info['timestamp'],
+                'files': series_files[target_uid]
+            })
+    
     for series_uid, info in series_info.items():
         dcm = info['first_file']
         
-        for pattern_name, pattern_rules in patterns.items():
-            if pattern_name not in ['swi_pattern', 'flair_pattern']:
-                continue
-                
-            # For SeriesInstanceUID matching, handle it directly
-            if (pattern_rules.get('rules') and 
-                len(pattern_rules['rules']) == 1 and 
-                pattern_rules['rules'][0].get('tag') == 'SeriesInstanceUID' and
-                pattern_rules['rules'][0].get('operation') == 'equals'):
-                
-                target_uid = pattern_rules['rules'][0].get('value')
-                if series_uid == target_uid:
-                    logger.info(f"Series {series_uid} matches pattern {pattern_name} by direct UID comparison")
-                    pattern_series[pattern_name].append({
-                        'series_uid': series_uid,
-                        'description': info['description'],
-                        'timestamp': info['timestamp'],
-                        'files': series_files[series_uid]
-                    })
-                continue
-                
-            # Otherwise use the rule checker
+        for pattern_name, pattern_rules in rule_patterns:
             success, error_msg = rule_checker.check_pattern_rules(dcm, pattern_rules)
             if success:
                 logger.info(f"Series {series_uid} matches pattern {pattern_name}")
@@ -357,7 +621,7 @@ def find_dicom_series(directory, settings):
                 })
             else:
                 # Log reasons for not matching
-                logger.debug(f"Series {series_uid} does not match {pattern_name}: {error_msg}")
+                logger.debug("Series %s does not match %s: %s", series_uid, pattern_name, error_msg)
     
     # Handle multiple matches by selecting the latest series
     for pattern_name, matched_series in pattern_series.items():
@@ -1,19 +1,62 @@
 import os
-from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import pydicom
 
+# The DICOM check is mostly open/seek/read syscalls that release the GIL, so
+# threads overlap the per-file latency (notably on network storage)
+DICOM_CHECK_WORKERS = 32
+
+def _iter_files(directory):
+    """Yield the paths of all files in and under directory, walking with os.scandir"""
+    stack = [str(directory)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            # Unreadable directories are skipped, as os.walk does
+            continue
+        subdirs = []
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    yield entry.path
+        # Reversed so the first subdirectory is visited next, as in os.walk
+        stack.extend(reversed(subdirs))
+
+def _is_dicom(file_path):
+    """Check for a DICOM file, from its preamble if present, else by parsing the header"""
+    try:
+        with open(file_path, 'rb') as f:
+            f.seek(128)
+            if f.read(4) == b'DICM':
+                return True
+        # No preamble, e.g. raw datasets; fall back to a forced header read
+        pydicom.dcmread(file_path, stop_before_pixels=True, force=True)
+        return True
+    except:
+        return False
+
+def iter_dicom_files(directory):
+    """Recursively yield the paths of DICOM files in directory, relative to it"""
+    prefix_len = len(os.path.join(str(directory), ''))
+    with ThreadPoolExecutor(max_workers=DICOM_CHECK_WORKERS) as executor:
+        # Keep a bounded window of checks in flight so the walk still streams,
+        # and yield in walk order as each oldest check completes
+        pending = deque()
+        for file_path in _iter_files(directory):
+            pending.append((file_path, executor.submit(_is_dicom, file_path)))
+            if len(pending) >= DICOM_CHECK_WORKERS * 4:
+                file_path, future = pending.popleft()
+                if future.result():
+                    yield file_path[prefix_len:]
+        while pending:
+            file_path, future = pending.popleft()
+            if future.result():
+                yield file_path[prefix_len:]
+
 def find_dicom_files(directory):
     """Recursively find all DICOM files in directory"""
-    dicom_files = []
-    
-    for root, _, files in os.walk(directory):
-        for file in files:
-            try:
-                file_path = Path(root) / file
-                pydicom.dcmread(str(file_path), force=True)
-                rel_path = os.path.relpath(str(file_path), directory)
-                dicom_files.append(rel_path)
-            except:
-                continue
-    
-    return dicom_files 
\ No newline at end of file
+    return list(iter_dicom_files(directory))
@@ -1,26 +1,28 @@
 import logging
-from typing import Any, Dict, Tuple, List, Union
+import re
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple, List, Union
+from pydicom.datadict import tag_for_keyword
 
 logger = logging.getLogger(__name__)
 
+# Cached marker for a tag that is absent from the dataset
+_MISSING = object()
+
 class RuleChecker:
     """Class to check DICOM pattern rules"""
 
     def __init__(self):
+        # Numeric comparisons, which compile to a call of these methods. The
+        # string and regex operations are built in _compile_operation
         self.operations = {
-            'equals': self._equals,
-            'contains': self._contains,
-            'contains_all': self._contains_all,
-            'contains_any': self._contains_any,
-            'starts_with': self._starts_with,
-            'ends_with': self._ends_with,
-            'regex': self._regex,
             'range': self._range,
             'greater_than': self._greater_than,
-            'less_than': self._less_than,
-            'not_equals': self._not_equals,
-            'not_contains': self._not_contains
+            'less_than': self._less_than
         }
+        # Compiled rules per pattern dict, keyed by id() and holding a
+        # reference to the dict so the id cannot be reused while cached
+        self._compiled_patterns = {}
 
     def check_pattern_rules(self, dicom_data: Any, pattern_rules: Dict) -> Tuple[bool, str]:
         """
@@ -35,18 +37,49 @@ class RuleChecker:
             matches: True if all rules match, False otherwise
             reason: String explaining why rules didn't match (empty if matched)
         """
-        rules = pattern_rules.get('rules', [])
-        if not rules:
+        compiled_rules = self.compile_pattern(pattern_rules)
+        if not compiled_rules:
             return False, "No rules defined"
 
-        for rule in rules:
-            if not self._check_rule(dicom_data, rule):
-                return False, f"Failed rule: {rule}"
+        # Tag values already read for this dataset, so several rules on the
+        # same tag resolve it through pydicom only once
+        value_cache = {}
+        for compiled_rule in compiled_rules:
+            if not self._check_compiled_rule(dicom_data, compiled_rule, value_cache):
+                return False, f"Failed rule: {compiled_rule[0]}"
 
         return True, ""
 
-    def _check_rule(self, dicom_data: Any, rule: Dict) -> bool:
-        """Check if DICOM data matches a single rule"""
+    def compile_pattern(self, pattern_rules: Dict) -> List[Tuple]:
+        """
+        Compile the rules of a pattern into ready-to-call predicates
+        
+        Rules are fixed for a run, so rule values are lowercased, regexes are
+        compiled and operations are looked up once per pattern instead of
+        once per checked file. SeriesDescription rules are ordered first. The
+        result is cached on the checker.
+        
+        Args:
+            pattern_rules: Dictionary containing rules to check
+            
+        Returns:
+            List of (rule, tag, required, predicate) tuples; predicate is None
+            for malformed rules, which never match
+        """
+        cached = self._compiled_patterns.get(id(pattern_rules))
+        if cached is not None and cached[0] is pattern_rules:
+            return cached[1]
+
+        compiled_rules = [self._compile_rule(rule) for rule in pattern_rules.get('rules', [])]
+        # All rules must match, so order does not change the result. The
+        # description check is the cheapest and rejects most series, so put
+        # it first and the remaining rules only run for likely candidates
+        compiled_rules.sort(key=lambda compiled_rule: compiled_rule[1] != 'SeriesDescription')
+        self._compiled_patterns[id(pattern_rules)] = (pattern_rules, compiled_rules)
+        return compiled_rules
+
+    def _compile_rule(self, rule: Dict) -> Tuple:
+        """Compile a single rule into a (rule, tag, required, predicate) tuple"""
         tag = rule.get('tag')
         operation = rule.get('operation')
         value = rule.get('value')
@@ -54,53 +87,122 @@ class RuleChecker:
 
         if not all([tag, operation, value is not None]):
             logger.warning(f"Invalid rule format: {rule}")
-            return False
-
-        if tag not in dicom_data:
-            return not required
+            return rule, tag, required, None
 
         try:
-            dicom_value = str(getattr(dicom_data, tag))
-            operation_func = self.operations.get(operation)
-            
-            if operation_func:
-                return operation_func(dicom_value, value)
-            else:
-                logger.warning(f"Unknown operation: {operation}")
-                return False
-                
+            predicate = self._compile_operation(operation, value)
         except Exception as e:
+            # A rule value of the wrong type (e.g. a number for contains_any
+            # or regex) makes the rule fail instead of aborting the check
             logger.error(f"Error checking rule {rule}: {str(e)}")
+            predicate = lambda dicom_value: False
+        return rule, tag, required, predicate
+
+    def _compile_operation(self, operation: str, value: Any) -> Callable[[str], bool]:
+        """Build a predicate on the DICOM value string with the rule value pre-processed"""
+        if operation in ('equals', 'not_equals'):
+            expected = str(value).lower()
+            if operation == 'equals':
+                return lambda dicom_value: dicom_value.lower() == expected
+            return lambda dicom_value: dicom_value.lower() != expected
+
+        if operation in ('contains', 'not_contains'):
+            needle = str(value).lower()
+            if operation == 'contains':
+                return lambda dicom_value: needle in dicom_value.lower()
+            return lambda dicom_value: needle not in dicom_value.lower()
+
+        if operation == 'contains_all':
+            needles = [str(v).lower() for v in value]
+            def match_all(dicom_value: str) -> bool:
+                dicom_value = dicom_value.lower()
+                return all(needle in dicom_value for needle in needles)
+            return match_all
+
+        if operation == 'contains_any':
+            needles = [str(v).lower() for v in value]
+            if not needles:
+                return lambda dicom_value: False
+            # One alternation scans the value once, whatever the number of needles
+            search = re.compile('|'.join(re.escape(needle) for needle in needles)).search
+            return lambda dicom_value: search(dicom_value.lower()) is not None
+
+        if operation == 'starts_with':
+            prefix = str(value).lower()
+            return lambda dicom_value: dicom_value.lower().startswith(prefix)
+
+        if operation == 'ends_with':
+            suffix = str(value).lower()
+            return lambda dicom_value: dicom_value.lower().endswith(suffix)
+
+        if operation == 'regex':
+            try:
+                search = re.compile(value).search
+            except re.error:
+                logger.error(f"Invalid regex pattern: {value}")
+                return lambda dicom_value: False
+            return lambda dicom_value: search(dicom_value) is not None
+
+        operation_func = self.operations.get(operation)
+        if operation_func:
+            # Numeric comparisons keep their own parsing and error handling
+            return partial(self._call_operation, operation_func, value)
+
+        logger.warning(f"Unknown operation: {operation}")
+        return lambda dicom_value: False
+
+    @staticmethod
+    def _call_operation(operation_func: Callable, value: Any, dicom_value: str) -> bool:
+        return operation_func(dicom_value, value)
+
+    def _check_compiled_rule(self, dicom_data: Any, compiled_rule: Tuple,
+                             value_cache: Optional[Dict[str, Any]] = None) -> bool:
+        """Check if DICOM data matches a single compiled rule, reusing tag values from value_cache"""
+        rule, tag, required, predicate = compiled_rule
+        if predicate is None:
             return False
 
-    def _equals(self, dicom_value: str, rule_value: str) -> bool:
-        return dicom_value.lower() == str(rule_value).lower()
-
-    def _contains(self, dicom_value: str, rule_value: str) -> bool:
-        return str(rule_value).lower() in dicom_value.lower()
-
-    def _contains_all(self, dicom_value: str, rule_values: List[str]) -> bool:
-        dicom_value = dicom_value.lower()
-        return all(str(v).lower() in dicom_value for v in rule_values)
-
-    def _contains_any(self, dicom_value: str, rule_values: List[str]) -> bool:
-        dicom_value = dicom_value.lower()
-        return any(str(v).lower() in dicom_value for v in rule_values)
-
-    def _starts_with(self, dicom_value: str, rule_value: str) -> bool:
-        return dicom_value.lower().startswith(str(rule_value).lower())
-
-    def _ends_with(self, dicom_value: str, rule_value: str) -> bool:
-        return dicom_value.lower().endswith(str(rule_value).lower())
+        dicom_value = value_cache.get(tag) if value_cache is not None else None
+        if dicom_value is None:
+            if tag not in dicom_data:
+                dicom_value = _MISSING
+            else:
+                try:
+                    dicom_value = str(getattr(dicom_data, tag))
+                except Exception as e:
+                    logger.error(f"Error checking rule {rule}: {str(e)}")
+                    return False
+            if value_cache is not None:
+                value_cache[tag] = dicom_value
+
+        if dicom_value is _MISSING:
+            return not required
 
-    def _regex(self, dicom_value: str, pattern: str) -> bool:
-        import re
         try:
-            return bool(re.search(pattern, dicom_value))
-        except re.error:
-            logger.error(f"Invalid regex pattern: {pattern}")
+            return predicate(dicom_value)
+        except Exception as e:
+            logger.error(f"Error checking rule {rule}: {str(e)}")
             return False
 
+    @staticmethod
+    def required_tags(*patterns: Dict) -> List[str]:
+        """
+        Collect the DICOM tag keywords inspected by the given patterns
+        
+        Args:
+            patterns: Dictionaries containing rules to check
+            
+        Returns:
+            List of known DICOM keywords, suitable for pydicom's specific_tags
+        """
+        tags = []
+        for pattern_rules in patterns:
+            for rule in pattern_rules.get('rules', []):
+                tag = rule.get('tag')
+                if tag and tag not in tags and tag_for_keyword(tag) is not None:
+                    tags.append(tag)
+        return tags
+
     def _range(self, dicom_value: str, range_dict: Dict[str, Union[int, float]]) -> bool:
         try:
             value = float(dicom_value)
@@ -121,9 +223,3 @@ class RuleChecker:
             return float(dicom_value) < float(rule_value)
         except (ValueError, TypeError):
             return False
-
-    def _not_equals(self, dicom_value: str, rule_value: str) -> bool:
-        return not self._equals(dicom_value, rule_value)
-
-    def _not_contains(self, dicom_value: str, rule_value: str) -> bool:
-        return not self._contains(dicom_value, rule_value)
@@ -8,7 +8,13 @@ def collect_series(in_folder, dicom_files, settings):
     for file in dicom_files:
         try:
             dicom_path = Path(in_folder) / file
-            dicom = pydicom.dcmread(str(dicom_path), force=True)
+            # Only the two tags used below are parsed
+            dicom = pydicom.dcmread(
+                str(dicom_path),
+                stop_before_pixels=True,
+                force=True,
+                specific_tags=['SeriesDescription', 'SeriesInstanceUID']
+            )
             
             series_desc = getattr(dicom, 'SeriesDescription', 'Unknown')
             series_uid = getattr(dicom, 'SeriesInstanceUID', 'Unknown')
@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+nib = pytest.importorskip('nibabel')
+pydicom = pytest.importorskip('pydicom')
+
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from converters.nifti_to_dicom import nifti_to_dicom
+
+MR_IMAGE_STORAGE = '1.2.840.10008.5.1.4.1.1.4'
+
+
+def _write_reference_series(directory, rows, cols, n_slices):
+    """Write a minimal single-frame MR reference series and return its first slice"""
+    study_uid = generate_uid()
+    series_uid = generate_uid()
+    for z in range(n_slices):
+        ds = Dataset()
+        ds.file_meta = FileMetaDataset()
+        ds.file_meta.MediaStorageSOPClassUID = MR_IMAGE_STORAGE
+        ds.file_meta.MediaStorageSOPInstanceUID = generate_uid()
+        ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+        ds.is_implicit_VR = False
+        ds.is_little_endian = True
+        ds.SOPClassUID = MR_IMAGE_STORAGE
+        ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
+        ds.StudyInstanceUID = study_uid
+        ds.SeriesInstanceUID = series_uid
+        ds.Modality = 'MR'
+        ds.InstanceNumber = z + 1
+        ds.ImagePositionPatient = [0, 0, 3 * z]
+        ds.Rows = rows
+        ds.Columns = cols
+        ds.save_as(os.path.join(directory, f'ref_{z:04d}.dcm'), write_like_original=False)
+    return pydicom.dcmread(os.path.join(directory, 'ref_0000.dcm'))
+
+
+def _expected_slices(data):
+    """Baseline conversion: transpose each (cols, rows) slice, flip both axes, scale to 12 bits"""
+    scaled = (data - data.min()) / (data.max() - data.min()) * 4095
+    return [np.flip(scaled[:, :, z].T, (0, 1)) for z in range(data.shape[2])]
+
+
+@pytest.mark.parametrize('rows, cols', [(8, 8), (8, 6)])
+def test_slices_are_transposed_to_reference_rows_and_columns(tmp_path, rows, cols):
+    # Square slices match both the plain and the transposed reference shape;
+    # they must still be transposed, like the non-square (cols, rows) case
+    n_slices = 5
+    reference_dir = tmp_path / 'reference'
+    out_dir = tmp_path / 'out'
+    reference_dir.mkdir()
+    reference_dicom = _write_reference_series(str(reference_dir), rows, cols, n_slices)
+
+    data = np.arange(cols * rows * n_slices, dtype=np.float32).reshape(cols, rows, n_slices)
+    nifti = nib.Nifti1Image(data, np.diag([1.0, 1.0, 3.0, 1.0]))
+
+    series_uid = generate_uid()
+    assert nifti_to_dicom(nifti, reference_dicom, str(out_dir), series_uid)
+
+    outputs = sorted(
+        (pydicom.dcmread(str(out_dir / name)) for name in os.listdir(out_dir)),
+        key=lambda ds: int(ds.InstanceNumber)
+    )
+    assert len(outputs) == n_slices
+    for ds, expected in zip(outputs, _expected_slices(data)):
+        assert (ds.Rows, ds.Columns) == (rows, cols)
+        np.testing.assert_allclose(ds.pixel_array, expected, atol=1)
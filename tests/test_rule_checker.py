@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('pydicom')
+
+from pydicom.dataset import Dataset
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.rule_checker import RuleChecker
+
+
+@pytest.mark.parametrize('operation', ['contains_all', 'contains_any', 'regex'])
+def test_rule_with_wrong_value_type_fails_instead_of_raising(operation):
+    ds = Dataset()
+    ds.SeriesDescription = 'SWI AXIAL'
+    rule = {'tag': 'SeriesDescription', 'operation': operation, 'value': 5}
+
+    assert RuleChecker().check_pattern_rules(ds, {'rules': [rule]}) == (False, f"Failed rule: {rule}")